@@ -24,6 +24,8 @@ import os
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
+import ssh_utils
+
 
 class DHCPManager:
     """Manages DHCP services for overlay networks using dnsmasq"""
@@ -66,14 +68,8 @@ class DHCPManager:
 
     def _ssh_exec(self, host_ip: str, username: str, password: str,
                   command: str, timeout: int = 60) -> Tuple[int, str, str]:
-        """Execute command on remote host via SSH"""
-        ssh_cmd = [
-            'sshpass', '-p', password,
-            'ssh', '-o', 'StrictHostKeyChecking=no',
-            '-o', 'ConnectTimeout=10',
-            f'{username}@{host_ip}',
-            command
-        ]
+        """Execute command on remote host via SSH (multiplexed connection)"""
+        ssh_cmd = ssh_utils.build_ssh_cmd(host_ip, username, password) + [command]
 
         try:
             result = subprocess.run(
@@ -497,6 +493,7 @@ no-resolv
             'gateway': gateway,
             'dhcp_start': dhcp_start,
             'dhcp_end': dhcp_end,
+            'dhcp_range': f'{dhcp_start} - {dhcp_end}',  # Prebuilt display string
             'netmask': netmask,
             'lease_time': lease_time,
             'dns_servers': dns_servers or ['8.8.8.8', '8.8.4.4'],
@@ -576,6 +573,10 @@ no-resolv
         print(f"   DHCP disabled successfully!")
         return result
 
+    def get_dhcp_config_map(self) -> Dict[int, Dict]:
+        """Get all DHCP configs keyed by network ID in one bulk fetch"""
+        return dict(self.dhcp_configs)
+
     def get_dhcp_config(self, network_id: int) -> Optional[Dict]:
         """Get DHCP configuration for a network"""
         return self.dhcp_configs.get(network_id)
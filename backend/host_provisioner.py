@@ -19,6 +19,8 @@ import json
 from typing import Dict, Optional, Tuple
 from datetime import datetime
 
+import ssh_utils
+
 
 class HostProvisioner:
     """Manages automatic host provisioning and OVS installation"""
@@ -43,23 +45,11 @@ class HostProvisioner:
         Returns:
             Tuple of (return_code, stdout, stderr)
         """
-        if self.password:
-            # Use sshpass for password authentication
-            ssh_cmd = [
-                'sshpass', '-p', self.password,
-                'ssh', '-o', 'StrictHostKeyChecking=no',
-                '-o', 'ConnectTimeout=10',
-                f'{self.username}@{self.ip}',
-                command
-            ]
-        else:
-            # Use SSH key authentication
-            ssh_cmd = [
-                'ssh', '-o', 'StrictHostKeyChecking=no',
-                '-o', 'ConnectTimeout=10',
-                f'{self.username}@{self.ip}',
-                command
-            ]
+        # Password auth via sshpass when set, SSH key auth otherwise;
+        # either way the connection is multiplexed and reused
+        ssh_cmd = ssh_utils.build_ssh_cmd(
+            self.ip, self.username, self.password
+        ) + [command]
 
         try:
             result = subprocess.run(
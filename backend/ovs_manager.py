@@ -13,14 +13,26 @@ import subprocess
 import json
 import re
 import os
+import threading
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
+import ssh_utils
+
+# Matches the version number in 'ovs-vsctl --version' output; compiled
+# once instead of per discovery call
+OVS_VERSION_RE = re.compile(r'ovs-vsctl.*?(\d+\.\d+\.\d+)')
+
 
 class OVSManager:
     """Manages OVS bridges on local and remote hosts"""
 
     def __init__(self, config_file: str = '/var/lib/recira/hosts.json'):
+        # Guards the host tables and next_host_id - the threaded server
+        # adds/removes hosts while other handler threads iterate them.
+        # Slow SSH discovery work stays outside the lock; only the final
+        # table mutations and snapshot reads take it.
+        self._lock = threading.RLock()
         self.hosts = {}  # {host_id: {hostname, ip, bridges, ...}}
         self.detached_hosts = {}  # {host_id: {hostname, ip, ...}} - hosts that were detached but not deleted
         self.next_host_id = 1
@@ -134,10 +146,8 @@ class OVSManager:
                         saved_hostname: Optional[str] = None) -> bool:
         """Reconnect to a previously saved host"""
         try:
-            ssh_cmd = ['sshpass', '-p', password, 'ssh',
-                      '-o', 'StrictHostKeyChecking=no',
-                      '-o', 'ConnectTimeout=5',
-                      f'{username}@{ip}']
+            ssh_cmd = ssh_utils.build_ssh_cmd(ip, username, password,
+                                              connect_timeout=5)
 
             # Get hostname
             try:
@@ -158,7 +168,7 @@ class OVSManager:
                     stderr=subprocess.STDOUT,
                     timeout=10
                 )
-                match = re.search(r'ovs-vsctl.*?(\d+\.\d+\.\d+)', ovs_output)
+                match = OVS_VERSION_RE.search(ovs_output)
                 ovs_version = match.group(1) if match else 'unknown'
             except:
                 ovs_version = 'unknown'
@@ -197,7 +207,8 @@ class OVSManager:
                 'ssh_password': password  # Store for persistence
             }
 
-            self.hosts[host_id] = host_info
+            with self._lock:
+                self.hosts[host_id] = host_info
             print(f"      Reconnected to {hostname} ({ip}) - {len(bridges)} bridge(s)")
             return True
 
@@ -229,20 +240,21 @@ class OVSManager:
             # Get all bridges
             bridges = self._get_local_bridges()
 
-            host_info = {
-                'id': self.next_host_id,
-                'hostname': hostname,
-                'ip': ip,
-                'management_ip': ip,  # For localhost, management IP is same as IP
-                'vxlan_ip': vxlan_ip if vxlan_ip else ip,  # Use provided or default to IP
-                'type': 'localhost',
-                'status': 'online',
-                'ovs_version': ovs_version,
-                'bridges': bridges
-            }
+            with self._lock:
+                host_info = {
+                    'id': self.next_host_id,
+                    'hostname': hostname,
+                    'ip': ip,
+                    'management_ip': ip,  # For localhost, management IP is same as IP
+                    'vxlan_ip': vxlan_ip if vxlan_ip else ip,  # Use provided or default to IP
+                    'type': 'localhost',
+                    'status': 'online',
+                    'ovs_version': ovs_version,
+                    'bridges': bridges
+                }
 
-            self.hosts[self.next_host_id] = host_info
-            self.next_host_id += 1
+                self.hosts[self.next_host_id] = host_info
+                self.next_host_id += 1
 
             return host_info
 
@@ -259,7 +271,7 @@ class OVSManager:
                 stderr=subprocess.STDOUT
             )
             # Parse version from output
-            match = re.search(r'ovs-vsctl.*?(\d+\.\d+\.\d+)', output)
+            match = OVS_VERSION_RE.search(output)
             if match:
                 return match.group(1)
             return 'unknown'
@@ -382,17 +394,10 @@ class OVSManager:
             Host info dict or None on error
         """
         try:
-            # Build SSH command prefix
-            ssh_cmd = ['ssh', '-o', 'StrictHostKeyChecking=no']
-
-            if key_file:
-                ssh_cmd.extend(['-i', key_file])
-
-            if password:
-                # Use sshpass if password provided
-                ssh_cmd = ['sshpass', '-p', password] + ssh_cmd
-
-            ssh_cmd.append(f'{username}@{ip}')
+            # Build SSH command prefix (multiplexed - reused across the
+            # hostname/version/bridge queries below)
+            ssh_cmd = ssh_utils.build_ssh_cmd(ip, username, password,
+                                              key_file=key_file)
 
             # Get hostname
             hostname = subprocess.check_output(
@@ -408,7 +413,7 @@ class OVSManager:
                 text=True,
                 stderr=subprocess.STDOUT
             )
-            match = re.search(r'ovs-vsctl.*?(\d+\.\d+\.\d+)', ovs_output)
+            match = OVS_VERSION_RE.search(ovs_output)
             ovs_version = match.group(1) if match else 'unknown'
 
             # Get bridges
@@ -429,25 +434,26 @@ class OVSManager:
                         if br_info:
                             bridges.append(br_info)
 
-            host_info = {
-                'id': self.next_host_id,
-                'hostname': hostname,
-                'ip': ip,
-                'management_ip': ip,  # IP we use to connect/manage
-                'vxlan_ip': vxlan_ip if vxlan_ip else ip,  # IP for VXLAN tunnels
-                'type': 'remote',
-                'status': 'online',
-                'ovs_version': ovs_version,
-                'bridges': bridges,
-                'ssh_user': username,
-                'ssh_password': password  # Store for persistence (WARNING: cleartext!)
-            }
+            with self._lock:
+                host_info = {
+                    'id': self.next_host_id,
+                    'hostname': hostname,
+                    'ip': ip,
+                    'management_ip': ip,  # IP we use to connect/manage
+                    'vxlan_ip': vxlan_ip if vxlan_ip else ip,  # IP for VXLAN tunnels
+                    'type': 'remote',
+                    'status': 'online',
+                    'ovs_version': ovs_version,
+                    'bridges': bridges,
+                    'ssh_user': username,
+                    'ssh_password': password  # Store for persistence (WARNING: cleartext!)
+                }
 
-            self.hosts[self.next_host_id] = host_info
-            self.next_host_id += 1
+                self.hosts[self.next_host_id] = host_info
+                self.next_host_id += 1
 
-            # Save hosts to disk for persistence
-            self._save_config()
+                # Save hosts to disk for persistence
+                self._save_config()
 
             return host_info
 
@@ -500,19 +506,21 @@ class OVSManager:
 
     def get_all_hosts(self) -> List[Dict]:
         """Get all discovered hosts (without exposing passwords)"""
-        hosts_list = []
-        for host in self.hosts.values():
-            # Create a copy without the password
-            host_copy = {k: v for k, v in host.items() if k != 'ssh_password'}
-            hosts_list.append(host_copy)
-        return hosts_list
+        with self._lock:
+            hosts_list = []
+            for host in self.hosts.values():
+                # Create a copy without the password
+                host_copy = {k: v for k, v in host.items() if k != 'ssh_password'}
+                hosts_list.append(host_copy)
+            return hosts_list
 
     def get_host_credentials(self, host_ip: str) -> Tuple[str, str]:
         """Get stored credentials for a host (for internal use)"""
-        for host in self.hosts.values():
-            if host.get('ip') == host_ip or host.get('management_ip') == host_ip:
-                return host.get('ssh_user', 'root'), host.get('ssh_password', '')
-        return 'root', ''
+        with self._lock:
+            for host in self.hosts.values():
+                if host.get('ip') == host_ip or host.get('management_ip') == host_ip:
+                    return host.get('ssh_user', 'root'), host.get('ssh_password', '')
+            return 'root', ''
 
     def remove_host(self, host_id: int, keep_data: bool = False) -> Dict:
         """
@@ -526,6 +534,12 @@ class OVSManager:
         Returns:
             Dict with success status and message
         """
+        # Everything below mutates the host tables, so hold the lock for
+        # the whole operation
+        with self._lock:
+            return self._remove_host_locked(host_id, keep_data)
+
+    def _remove_host_locked(self, host_id: int, keep_data: bool) -> Dict:
         result = {
             'success': False,
             'host_id': host_id,
@@ -608,11 +622,11 @@ class OVSManager:
             'message': ''
         }
 
-        if host_id not in self.detached_hosts:
+        with self._lock:
+            detached = self.detached_hosts.get(host_id)
+        if detached is None:
             result['message'] = f'Detached host {host_id} not found'
             return result
-
-        detached = self.detached_hosts[host_id]
         ip = detached.get('management_ip') or detached.get('ip')
         username = detached.get('ssh_user', 'root')
         password = detached.get('ssh_password')
@@ -636,8 +650,9 @@ class OVSManager:
 
         if success:
             # Remove from detached
-            del self.detached_hosts[host_id]
-            self._save_config()
+            with self._lock:
+                self.detached_hosts.pop(host_id, None)
+                self._save_config()
 
             result['success'] = True
             result['message'] = f'Host {detached.get("hostname", ip)} re-attached successfully'
@@ -649,22 +664,26 @@ class OVSManager:
 
     def get_detached_hosts(self) -> List[Dict]:
         """Get list of detached hosts (without exposing passwords)"""
-        detached_list = []
-        for host_id, host in self.detached_hosts.items():
-            host_copy = {k: v for k, v in host.items() if k != 'ssh_password'}
-            host_copy['id'] = host_id
-            detached_list.append(host_copy)
-        return detached_list
+        with self._lock:
+            detached_list = []
+            for host_id, host in self.detached_hosts.items():
+                host_copy = {k: v for k, v in host.items() if k != 'ssh_password'}
+                host_copy['id'] = host_id
+                detached_list.append(host_copy)
+            return detached_list
 
     def get_all_switches(self) -> List[Dict]:
         """
         Get all switches from all hosts
         Returns list of switches with host info included
         """
+        with self._lock:
+            hosts = list(self.hosts.values())
+
         switches = []
         switch_id = 1
 
-        for host in self.hosts.values():
+        for host in hosts:
             for bridge in host.get('bridges', []):
                 switch = {
                     'id': switch_id,
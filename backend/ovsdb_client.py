@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+OVSDB Client - Minimal JSON-RPC client for the local OVSDB socket
+
+Talking JSON-RPC to ovsdb-server directly avoids forking an ovs-vsctl
+process (and scraping its text output) for read-heavy paths like tunnel
+discovery. Only the 'transact' method with 'select' operations is
+implemented - enough to dump tables in one round trip.
+"""
+
+import json
+import os
+import socket
+import threading
+
+# Well-known locations of the OVSDB unix socket
+DEFAULT_SOCKET_PATHS = (
+    '/var/run/openvswitch/db.sock',
+    '/usr/local/var/run/openvswitch/db.sock',
+)
+
+
+class OVSDBError(Exception):
+    """Raised when the OVSDB socket is unavailable or a transact fails"""
+    pass
+
+
+def unwrap(value):
+    """Unwrap an OVSDB atom (plain value or ['uuid', ...] pair)"""
+    if isinstance(value, list) and len(value) == 2 and value[0] in ('uuid', 'named-uuid'):
+        return value[1]
+    return value
+
+
+def atoms(value) -> list:
+    """Expand an OVSDB column value (atom or ['set', [...]]) into a list"""
+    if isinstance(value, list) and value and value[0] == 'set':
+        return [unwrap(v) for v in value[1]]
+    return [unwrap(value)]
+
+
+def to_map(value) -> dict:
+    """Convert an OVSDB ['map', [[k, v], ...]] value into a dict"""
+    if isinstance(value, list) and value and value[0] == 'map':
+        return dict(value[1])
+    return {}
+
+
+class OVSDBClient:
+    """JSON-RPC connection to the local ovsdb-server"""
+
+    def __init__(self, socket_path: str = None, timeout: float = 5.0):
+        self.socket_path = socket_path or self._find_socket()
+        self.timeout = timeout
+        self._sock = None
+        self._buffer = ''
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _find_socket() -> str:
+        for path in DEFAULT_SOCKET_PATHS:
+            if os.path.exists(path):
+                return path
+        raise OVSDBError('OVSDB socket not found')
+
+    def connect(self):
+        """Open the unix socket connection"""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self._sock = sock
+        self._buffer = ''
+
+    def close(self):
+        """Close the connection (safe to call repeatedly)"""
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+            self._buffer = ''
+
+    def transact(self, *ops) -> list:
+        """Run OVSDB operations in one transaction and return the results
+
+        Args:
+            *ops: Operation dicts, e.g. {'op': 'select', 'table': 'Bridge',
+                  'where': [], 'columns': ['name', 'ports']}
+
+        Returns:
+            List with one result dict per operation.
+        """
+        with self._lock:
+            if self._sock is None:
+                self.connect()
+
+            self._next_id += 1
+            request = {
+                'method': 'transact',
+                'params': ['Open_vSwitch'] + list(ops),
+                'id': self._next_id,
+            }
+
+            try:
+                self._sock.sendall(json.dumps(request).encode('utf-8'))
+                while True:
+                    msg = self._read_message()
+                    if msg.get('id') == self._next_id:
+                        if msg.get('error'):
+                            raise OVSDBError(f"transact failed: {msg['error']}")
+                        results = msg.get('result', [])
+                        for result in results:
+                            if isinstance(result, dict) and 'error' in result:
+                                raise OVSDBError(f"operation failed: {result}")
+                        return results
+                    if msg.get('method') == 'echo':
+                        # Server-side keepalive - answer it and keep reading
+                        reply = {'result': msg.get('params', []),
+                                 'error': None, 'id': msg.get('id')}
+                        self._sock.sendall(json.dumps(reply).encode('utf-8'))
+            except (OSError, ValueError) as e:
+                # Connection is in an unknown state - drop it
+                self.close()
+                raise OVSDBError(f'OVSDB connection error: {e}')
+
+    def _read_message(self) -> dict:
+        """Read one JSON-RPC message (messages are back-to-back JSON values)"""
+        decoder = json.JSONDecoder()
+        while True:
+            if self._buffer:
+                try:
+                    msg, end = decoder.raw_decode(self._buffer)
+                except ValueError:
+                    pass  # Incomplete message - keep receiving
+                else:
+                    self._buffer = self._buffer[end:].lstrip()
+                    return msg
+            chunk = self._sock.recv(65536)
+            if not chunk:
+                raise OVSDBError('connection closed by ovsdb-server')
+            self._buffer += chunk.decode('utf-8')
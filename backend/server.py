@@ -6,13 +6,30 @@ Repurposed from DVSC for generic OVS/VXLAN management
 Version: 0.7.2 - Tunnel Discovery + Host Persistence + DHCP Integration
 """
 
+import gzip
+import hashlib
 import http.server
-import socketserver
 import json
 import os
+import queue
+import shutil
+import socket
 import sys
-from urllib.parse import urlparse, parse_qs
-from datetime import datetime
+import threading
+import time
+from urllib.parse import parse_qs
+from datetime import datetime, timedelta
+
+# orjson serializes several times faster than the stdlib and returns
+# bytes directly; fall back to json so it stays an optional dependency
+try:
+    import orjson
+
+    def _json_dumps(obj):
+        return orjson.dumps(obj)
+except ImportError:
+    def _json_dumps(obj):
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
 
 # Add backend directory to path for imports
 sys.path.insert(0, os.path.dirname(__file__))
@@ -25,542 +42,839 @@ import dhcp_manager as dhcp_mgr
 PORT = 8080
 FRONTEND_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'frontend/37734')
 
-# Server start time for uptime calculation
-SERVER_START_TIME = datetime.now()
+# Number of worker processes (RECIRA_WORKERS env var, default 1).
+# With more than one, each worker binds the port with SO_REUSEPORT and
+# the kernel load-balances incoming connections between them.
+#
+# LIMITATION: the managers keep their state in process memory, and each
+# forked worker gets an independent copy. A host or tunnel created
+# through one worker is invisible (and undeletable) on the others, and
+# two workers can hand out the same tunnel id. Until manager state moves
+# to a shared store, WORKERS > 1 is only suitable for read-mostly
+# deployments (dashboards, monitoring) where mutations are rare or go
+# through a single designated instance.
+WORKERS = int(os.environ.get('RECIRA_WORKERS', '1'))
+
+# Server start time for uptime calculation (monotonic clock - immune to
+# wall-clock jumps and cheaper to read than datetime.now())
+SERVER_START_MONOTONIC = time.monotonic()
+
+# Uptime string changes at most once a second, so memoize it
+_uptime_cache = (-1, '0:00:00')
 
 # Initialize managers
 vxlan_manager = None
 network_manager = None
 dhcp_manager = None
 
+# Constant responses, serialized once at import instead of per request
+_EMPTY_TUNNELS_BODY = _json_dumps({"tunnels": []})
+_EMPTY_NETWORKS_BODY = _json_dumps({"networks": []})
+
+# Access log lines go through this queue to a background writer thread,
+# so a slow/blocked stdout never stalls request handling
+_log_queue = queue.SimpleQueue()
+
+
+def _log_writer():
+    while True:
+        print(_log_queue.get())
+
+
+def _start_log_writer(after_fork=False):
+    """Start the access-log writer thread for this process
+
+    Threads do not survive fork(), so each worker child must start its
+    own consumer - otherwise its requests are never logged and the queue
+    grows without bound. Children also get a fresh queue: the inherited
+    one may have been snapshotted mid-operation by the fork.
+    """
+    global _log_queue
+    if after_fork:
+        _log_queue = queue.SimpleQueue()
+    threading.Thread(target=_log_writer, daemon=True).start()
+
+
+# Log timestamps have 1s resolution, so strftime only needs to run when
+# the second changes, not for every request
+_log_ts_cache = (0, '')
+
+
+def _log_timestamp():
+    global _log_ts_cache
+    now = int(time.time())
+    if _log_ts_cache[0] != now:
+        _log_ts_cache = (now, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    return _log_ts_cache[1]
+
+
+_start_log_writer()
+
+# In-memory cache for small static frontend files: {path: (mtime, size, etag, bytes)}
+STATIC_CACHE_MAX_FILE_SIZE = 256 * 1024  # Only cache files up to 256KB
+static_cache = {}
+static_cache_lock = threading.Lock()
+
 class VXLANRequestHandler(http.server.SimpleHTTPRequestHandler):
     """Custom request handler for VXLAN Web Controller"""
 
+    # HTTP/1.1 so connections are kept alive between requests - polling
+    # clients reuse the TCP connection instead of reconnecting every time
+    protocol_version = "HTTP/1.1"
+
+    # Close keep-alive connections idle for this long so abandoned
+    # clients don't pin handler threads indefinitely
+    timeout = 60
+
+    # TCP_NODELAY: send small JSON responses immediately instead of
+    # letting Nagle's algorithm hold them back for coalescing
+    disable_nagle_algorithm = True
+
+    # Only gzip JSON bodies bigger than this (compression isn't worth it below)
+    GZIP_MIN_SIZE = 1024
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=FRONTEND_DIR, **kwargs)
 
     def do_GET(self):
         """Handle GET requests"""
-        parsed_path = urlparse(self.path)
-        path = parsed_path.path
+        # str.partition is enough here - we only need path vs query, not
+        # the full six-tuple urlparse builds
+        path, _, query = self.path.partition('?')
 
         # API endpoints
         if path.startswith('/api/'):
-            self.handle_api_request(path, parsed_path.query)
+            self.handle_api_request(path, query)
         # Redirect root to main UI
         elif path == '/':
             self.send_response(302)
             self.send_header('Location', '/index.html')
+            self.send_header('Content-Length', '0')
             self.end_headers()
         # Serve static files
         else:
+            self.serve_static_file()
+
+    def serve_static_file(self):
+        """Serve a static frontend file with caching and zero-copy writes
+
+        Small files are cached in memory keyed by (mtime, size); clients get
+        an ETag and a 304 on If-None-Match, so the SPA bundle is usually not
+        re-sent at all. Large files go out via os.sendfile instead of the
+        Python-level copy loop in SimpleHTTPRequestHandler.
+        """
+        filepath = self.translate_path(self.path)
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            # Missing file, directory listing etc. - let the base class handle it
             super().do_GET()
+            return
+
+        if not os.path.isfile(filepath):
+            super().do_GET()
+            return
+
+        mtime, size = st.st_mtime, st.st_size
+        etag = f'"{hashlib.sha1(f"{mtime}:{size}".encode()).hexdigest()}"'
+
+        # Client already has this version?
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            return
+
+        content_type = self.guess_type(filepath)
+
+        # Small files: serve from the in-memory cache
+        if size <= STATIC_CACHE_MAX_FILE_SIZE:
+            with static_cache_lock:
+                cached = static_cache.get(filepath)
+            if not cached or cached[0] != mtime or cached[1] != size:
+                with open(filepath, 'rb') as f:
+                    body = f.read()
+                cached = (mtime, size, etag, body)
+                with static_cache_lock:
+                    static_cache[filepath] = cached
+
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(size))
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            self.wfile.write(cached[3])
+            return
+
+        # Large files: hand the copy to the kernel with sendfile
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(size))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+        with open(filepath, 'rb') as f:
+            # Tell the kernel this is a sequential read so it can do
+            # aggressive readahead for the sendfile loop below
+            if hasattr(os, 'posix_fadvise'):
+                try:
+                    os.posix_fadvise(f.fileno(), 0, size, os.POSIX_FADV_SEQUENTIAL)
+                except OSError:
+                    pass
+
+            # socket.sendfile drives os.sendfile for us (handling partial
+            # sends and EINTR) and transparently falls back to send() on
+            # platforms without kernel sendfile
+            self.wfile.flush()
+            self.connection.sendfile(f)
+
+    def copyfile(self, source, outputfile):
+        """Copy with a 256KB buffer on the base-class fallback path
+
+        Only responses that bypass serve_static_file (directory listings,
+        error pages) land here; the default 64KB shutil buffer means four
+        times the syscalls per MB.
+        """
+        shutil.copyfileobj(source, outputfile, length=256 * 1024)
 
     def do_POST(self):
         """Handle POST requests for API"""
-        parsed_path = urlparse(self.path)
-        path = parsed_path.path
+        path = self.path.partition('?')[0]
 
         if path.startswith('/api/'):
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            try:
-                data = json.loads(post_data.decode('utf-8'))
-            except:
+            content_length = int(self.headers.get('Content-Length') or 0)
+            if content_length:
+                post_data = self.rfile.read(content_length)
+                try:
+                    data = json.loads(post_data)
+                except:
+                    data = {}
+            else:
+                # Empty body - nothing to read or parse
                 data = {}
             self.handle_api_request(path, data=data)
         else:
             self.send_error(404, "Not Found")
 
     def handle_api_request(self, path, query=None, data=None):
-        """Handle API requests with real OVS data"""
-
-        if path == '/api/status':
-            # Real status with actual uptime
-            uptime = datetime.now() - SERVER_START_TIME
-            uptime_str = str(uptime).split('.')[0]  # Remove microseconds
-
-            response = {
-                "status": "running",
-                "version": "0.7.2",
-                "uptime": uptime_str,
-                "controller": "Recira - Virtual Network Platform",
-                "hosts": len(ovs_manager.get_all_hosts()),
-                "switches": len(ovs_manager.get_all_switches()),
-                "networks": len(network_manager.get_all_networks()) if network_manager else 0,
-                "dhcp_enabled": len(dhcp_manager.get_all_dhcp_configs()) if dhcp_manager else 0
-            }
+        """Handle API requests with real OVS data
 
-        elif path == '/api/switches':
-            # Real switch data from OVS
-            switches = ovs_manager.get_all_switches()
-
-            # Add mock 'flows' field for now (will implement flow counting later)
-            for switch in switches:
-                switch['flows'] = 0  # Placeholder
-                switch['host'] = switch['host_ip']  # Add for compatibility
-
-            response = {"switches": switches}
-
-        elif path == '/api/hosts':
-            # Real host data
-            hosts = ovs_manager.get_all_hosts()
-
-            # Format bridge names for display (make copies to avoid modifying original)
-            formatted_hosts = []
-            for host in hosts:
-                host_copy = {
-                    'id': host['id'],
-                    'hostname': host['hostname'],
-                    'ip': host['ip'],
-                    'management_ip': host.get('management_ip', host['ip']),
-                    'vxlan_ip': host.get('vxlan_ip', host['ip']),
-                    'type': host.get('type', 'unknown'),
-                    'status': host.get('status', 'unknown'),
-                    'ovs_version': host.get('ovs_version', 'unknown'),
-                    'bridges': [br['name'] for br in host.get('bridges', [])]
-                }
-                formatted_hosts.append(host_copy)
-
-            response = {"hosts": formatted_hosts}
-
-        elif path == '/api/hosts/detached':
-            # Get detached hosts that can be re-attached
-            detached = ovs_manager.get_detached_hosts()
-            response = {"detached_hosts": detached}
-
-        elif path == '/api/topology':
-            # Build topology from real switches (no links yet)
-            switches = ovs_manager.get_all_switches()
-            nodes = []
-
-            for switch in switches:
-                nodes.append({
-                    "id": switch['id'],
-                    "type": "switch",
-                    "name": f"{switch['name']}@{switch['hostname']}",
-                    "dpid": switch['dpid']
-                })
-
-            response = {
-                "nodes": nodes,
-                "links": []  # Will implement VXLAN link discovery in v0.3
-            }
+        Dispatches via the GET_ROUTES/POST_ROUTES tables below - a single
+        dict lookup instead of a linear string-compare chain.
+        """
+        # Fused (is_post, path) key: one hash lookup, no method branch
+        handler = self.ROUTES.get((data is not None, path))
 
-        elif path == '/api/tunnels':
-            # Get all VXLAN tunnels
-            if vxlan_manager:
-                tunnels = vxlan_manager.get_all_tunnels()
-                response = {"tunnels": tunnels}
-            else:
-                response = {"tunnels": []}
-
-        elif path == '/api/networks':
-            # Get all virtual networks with DHCP status
-            if network_manager:
-                networks = network_manager.get_all_networks()
-                # Add DHCP status to each network
-                if dhcp_manager:
-                    for net in networks:
-                        dhcp_config = dhcp_manager.get_dhcp_config(net['id'])
-                        if dhcp_config:
-                            net['dhcp_enabled'] = True
-                            net['dhcp_host'] = dhcp_config.get('host_ip')
-                            net['dhcp_range'] = f"{dhcp_config.get('dhcp_start')} - {dhcp_config.get('dhcp_end')}"
-                        else:
-                            net['dhcp_enabled'] = False
-                response = {"networks": networks}
-            else:
-                response = {"networks": []}
-
-        elif path == '/api/networks/create' and data:
-            # Create a virtual network
-            name = data.get('name')
-            switches = data.get('switches', [])  # List of switch IDs
-            vni = data.get('vni')  # Optional
-            subnet = data.get('subnet', '')
-            gateway = data.get('gateway', '')
-
-            if not name:
-                response = {"error": "Missing required field: name"}
-            elif not switches or len(switches) < 2:
-                response = {"error": "Network requires at least 2 switches"}
-            elif not network_manager:
-                response = {"error": "Network manager not initialized"}
-            else:
-                network = network_manager.create_network(
-                    name=name,
-                    switches=switches,
-                    vni=int(vni) if vni else None,
-                    subnet=subnet,
-                    gateway=gateway
-                )
-
-                if network:
-                    response = {
-                        "success": True,
-                        "message": f"Network '{name}' created successfully",
-                        "network": network.to_dict()
-                    }
-                else:
-                    response = {
-                        "success": False,
-                        "error": "Failed to create network"
-                    }
-
-        elif path == '/api/networks/delete' and data:
-            # Delete a virtual network
-            network_id = data.get('network_id')
-
-            if not network_id:
-                response = {"error": "Missing required field: network_id"}
-            elif not network_manager:
-                response = {"error": "Network manager not initialized"}
-            else:
-                # Also disable DHCP if enabled
-                if dhcp_manager and dhcp_manager.get_dhcp_config(int(network_id)):
-                    dhcp_manager.disable_dhcp(int(network_id))
+        if handler:
+            response = handler(self, query, data)
+        else:
+            response = {"error": "Unknown API endpoint", "path": path}
 
-                success = network_manager.delete_network(int(network_id))
+        if isinstance(response, bytes):
+            # Handler returned a pre-serialized body
+            body = response
+        elif path in self.STREAMED_PATHS and self.request_version == 'HTTP/1.1':
+            # Potentially large payloads are streamed chunk by chunk
+            # instead of being serialized into one big buffer first.
+            # Chunked transfer coding is HTTP/1.1-only (RFC 7230 3.3.1);
+            # 1.0 clients get the buffered path below instead
+            self.send_streamed_json(response)
+            return
+        else:
+            # Compact JSON - these payloads are machine-consumed
+            body = _json_dumps(response)
 
-                if success:
-                    response = {
-                        "success": True,
-                        "message": "Network deleted successfully"
-                    }
-                else:
-                    response = {
-                        "success": False,
-                        "error": "Failed to delete network (network not found?)"
-                    }
-
-        # ============ DHCP API Endpoints (v0.7) ============
-
-        elif path == '/api/dhcp/enable' and data:
-            # Enable DHCP for a network
-            network_id = data.get('network_id')
-            host_ip = data.get('host_ip')
-            dhcp_start = data.get('dhcp_start')
-            dhcp_end = data.get('dhcp_end')
-            username = data.get('username')
-            password = data.get('password')
-            dns_servers = data.get('dns_servers')
-            lease_time = data.get('lease_time', '24h')
-
-            if not network_id or not host_ip or not dhcp_start or not dhcp_end:
-                response = {"error": "Missing required fields: network_id, host_ip, dhcp_start, dhcp_end"}
-            elif not dhcp_manager:
-                response = {"error": "DHCP manager not initialized"}
-            else:
-                result = dhcp_manager.enable_dhcp(
-                    network_id=int(network_id),
-                    host_ip=host_ip,
-                    dhcp_start=dhcp_start,
-                    dhcp_end=dhcp_end,
-                    username=username,
-                    password=password,
-                    dns_servers=dns_servers,
-                    lease_time=lease_time
-                )
-                response = result
-
-        elif path == '/api/dhcp/disable' and data:
-            # Disable DHCP for a network
-            network_id = data.get('network_id')
-            username = data.get('username')
-            password = data.get('password')
-
-            if not network_id:
-                response = {"error": "Missing required field: network_id"}
-            elif not dhcp_manager:
-                response = {"error": "DHCP manager not initialized"}
-            else:
-                result = dhcp_manager.disable_dhcp(
-                    network_id=int(network_id),
-                    username=username,
-                    password=password
-                )
-                response = result
-
-        elif path == '/api/dhcp/config' and query:
-            # Get DHCP configuration for a network (GET request)
-            params = parse_qs(query) if isinstance(query, str) else query
-            network_id = params.get('network_id', [None])[0] if isinstance(query, str) else query.get('network_id')
-
-            if not network_id:
-                response = {"error": "Missing required parameter: network_id"}
-            elif not dhcp_manager:
-                response = {"error": "DHCP manager not initialized"}
-            else:
-                config = dhcp_manager.get_dhcp_config(int(network_id))
-                if config:
-                    response = {"success": True, "dhcp_config": config}
-                else:
-                    response = {"success": False, "message": "DHCP not enabled for this network"}
-
-        elif path == '/api/dhcp/leases' and query:
-            # Get DHCP leases for a network (GET request)
-            params = parse_qs(query) if isinstance(query, str) else query
-            network_id = params.get('network_id', [None])[0] if isinstance(query, str) else query.get('network_id')
-            username = params.get('username', [None])[0] if isinstance(query, str) else query.get('username')
-            password = params.get('password', [None])[0] if isinstance(query, str) else query.get('password')
-
-            if not network_id:
-                response = {"error": "Missing required parameter: network_id"}
-            elif not dhcp_manager:
-                response = {"error": "DHCP manager not initialized"}
-            else:
-                result = dhcp_manager.get_dhcp_leases(
-                    network_id=int(network_id),
-                    username=username,
-                    password=password
-                )
-                response = result
-
-        elif path == '/api/dhcp/reservation' and data:
-            # Add DHCP reservation (POST request)
-            network_id = data.get('network_id')
-            mac = data.get('mac')
-            ip = data.get('ip')
-            hostname = data.get('hostname', '')
-            username = data.get('username')
-            password = data.get('password')
-
-            if not network_id or not mac or not ip:
-                response = {"error": "Missing required fields: network_id, mac, ip"}
-            elif not dhcp_manager:
-                response = {"error": "DHCP manager not initialized"}
-            else:
-                result = dhcp_manager.add_reservation(
-                    network_id=int(network_id),
-                    mac=mac,
-                    ip=ip,
-                    hostname=hostname,
-                    username=username,
-                    password=password
-                )
-                response = result
-
-        elif path == '/api/dhcp/reservation/delete' and data:
-            # Delete DHCP reservation (POST request)
-            network_id = data.get('network_id')
-            mac = data.get('mac')
-            username = data.get('username')
-            password = data.get('password')
-
-            if not network_id or not mac:
-                response = {"error": "Missing required fields: network_id, mac"}
-            elif not dhcp_manager:
-                response = {"error": "DHCP manager not initialized"}
-            else:
-                result = dhcp_manager.delete_reservation(
-                    network_id=int(network_id),
-                    mac=mac,
-                    username=username,
-                    password=password
-                )
-                response = result
-
-        # ============ End DHCP API Endpoints ============
-
-        elif path == '/api/hosts/add' and data:
-            # Add a remote host
-            ip = data.get('ip')
-            username = data.get('username', 'root')
-            password = data.get('password')
-            vxlan_ip = data.get('vxlan_ip')  # Optional VXLAN IP
-
-            if not ip or not password:
-                response = {"error": "Missing required fields: ip, password"}
-            else:
-                host_info = ovs_manager.discover_remote_host(
-                    ip=ip,
-                    username=username,
-                    password=password,
-                    vxlan_ip=vxlan_ip
-                )
-
-                if host_info:
-                    # Filter out password from response
-                    safe_host_info = {k: v for k, v in host_info.items() if k != 'ssh_password'}
-                    response = {
-                        "success": True,
-                        "message": f"Successfully added {host_info['hostname']}",
-                        "host": safe_host_info
-                    }
-                else:
-                    response = {
-                        "success": False,
-                        "error": f"Failed to connect to {ip}"
-                    }
-
-        elif path == '/api/hosts/provision' and data:
-            # Auto-provision a host with OVS installation
-            ip = data.get('ip')
-            username = data.get('username', 'root')
-            password = data.get('password')
-            vxlan_interface = data.get('vxlan_interface')
-            vxlan_ip = data.get('vxlan_ip')
-            configure_mtu = data.get('configure_mtu', True)
-            optimize = data.get('optimize', True)
-
-            if not ip or not password:
-                response = {"error": "Missing required fields: ip, password"}
-            else:
-                # Run provisioning (this may take several minutes)
-                provision_result = host_prov.provision_new_host(
-                    ip=ip,
-                    username=username,
-                    password=password,
-                    vxlan_interface=vxlan_interface,
-                    configure_mtu=configure_mtu,
-                    optimize=optimize
-                )
-
-                if provision_result['success']:
-                    # After provisioning, discover the host to add it to OVS manager
-                    host_info = ovs_manager.discover_remote_host(
-                        ip=ip,
-                        username=username,
-                        password=password,
-                        vxlan_ip=vxlan_ip
-                    )
-
-                    # Filter out password from response
-                    safe_host_info = {k: v for k, v in host_info.items() if k != 'ssh_password'} if host_info else None
-                    response = {
-                        "success": True,
-                        "message": f"Host {ip} provisioned successfully",
-                        "provision_details": provision_result,
-                        "host": safe_host_info
-                    }
-                else:
-                    response = {
-                        "success": False,
-                        "error": "Provisioning failed",
-                        "details": provision_result
-                    }
-
-        elif path == '/api/hosts/health' and query:
-            # Get health status of a specific host
-            params = parse_qs(query) if isinstance(query, str) else query
-            ip = params.get('ip', [None])[0] if isinstance(query, str) else query.get('ip')
-            username = params.get('username', ['root'])[0] if isinstance(query, str) else query.get('username', 'root')
-            password = params.get('password', [None])[0] if isinstance(query, str) else query.get('password')
-
-            if not ip:
-                response = {"error": "Missing required parameter: ip"}
-            else:
-                health_status = host_prov.get_host_status(
-                    ip=ip,
-                    username=username,
-                    password=password
-                )
-                response = {"health": health_status}
-
-        elif path == '/api/hosts/scan-interfaces' and query:
-            # Scan network interfaces on a host
-            params = parse_qs(query) if isinstance(query, str) else query
-            ip = params.get('ip', [None])[0] if isinstance(query, str) else query.get('ip')
-            username = params.get('username', ['root'])[0] if isinstance(query, str) else query.get('username', 'root')
-            password = params.get('password', [None])[0] if isinstance(query, str) else query.get('password')
-
-            if not ip:
-                response = {"error": "Missing required parameter: ip"}
-            else:
-                scan_result = host_prov.scan_host_interfaces(
-                    ip=ip,
-                    username=username,
-                    password=password
-                )
-                response = scan_result
-
-        elif path == '/api/hosts/remove' and data:
-            # Remove a host (detach or forget)
-            host_id = data.get('host_id')
-            keep_data = data.get('keep_data', False)  # True = detach, False = forget
-
-            if not host_id:
-                response = {"error": "Missing required field: host_id"}
-            else:
-                result = ovs_manager.remove_host(int(host_id), keep_data=keep_data)
-                response = result
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
 
-        elif path == '/api/hosts/reattach' and data:
-            # Re-attach a previously detached host
-            host_id = data.get('host_id')
+        # Compress larger bodies when the client supports it
+        if len(body) > self.GZIP_MIN_SIZE and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=1)
+            self.send_header('Content-Encoding', 'gzip')
 
-            if not host_id:
-                response = {"error": "Missing required field: host_id"}
-            else:
-                result = ovs_manager.reattach_host(int(host_id))
-                response = result
-
-        elif path == '/api/tunnels/create' and data:
-            # Create a VXLAN tunnel
-            src_switch_id = data.get('src_switch_id')
-            dst_switch_id = data.get('dst_switch_id')
-            vni = data.get('vni')  # Optional
-
-            if not src_switch_id or not dst_switch_id:
-                response = {"error": "Missing required fields: src_switch_id, dst_switch_id"}
-            elif not vxlan_manager:
-                response = {"error": "VXLAN manager not initialized"}
-            else:
-                tunnel_info = vxlan_manager.create_tunnel(
-                    src_switch_id=int(src_switch_id),
-                    dst_switch_id=int(dst_switch_id),
-                    vni=int(vni) if vni else None
-                )
-
-                if tunnel_info:
-                    response = {
-                        "success": True,
-                        "message": f"Tunnel created successfully",
-                        "tunnel": tunnel_info
-                    }
-                else:
-                    response = {
-                        "success": False,
-                        "error": "Failed to create tunnel"
-                    }
-
-        elif path == '/api/tunnels/delete' and data:
-            # Delete a VXLAN tunnel
-            tunnel_id = data.get('tunnel_id')
-
-            if not tunnel_id:
-                response = {"error": "Missing required field: tunnel_id"}
-            elif not vxlan_manager:
-                response = {"error": "VXLAN manager not initialized"}
-            else:
-                success = vxlan_manager.delete_tunnel(int(tunnel_id))
+        # Content-Length is required for HTTP/1.1 keep-alive to work
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
 
-                if success:
-                    response = {
-                        "success": True,
-                        "message": "Tunnel deleted successfully"
-                    }
-                else:
-                    response = {
-                        "success": False,
-                        "error": "Failed to delete tunnel (tunnel not found?)"
-                    }
+    # Responses that can grow with cluster size - streamed, not buffered
+    STREAMED_PATHS = frozenset({'/api/dhcp/leases', '/api/networks'})
 
-        else:
-            response = {"error": "Unknown API endpoint", "path": path}
+    # Flush streamed chunks once this much JSON has accumulated
+    STREAM_CHUNK_SIZE = 64 * 1024
 
-        # Send JSON response
+    def send_streamed_json(self, response):
+        """Stream a JSON response with chunked transfer encoding
+
+        Serializes incrementally with JSONEncoder.iterencode and writes
+        HTTP/1.1 chunks as ~64KB of output accumulates, so a large lease
+        table or network list never has to exist as one contiguous byte
+        buffer in memory. Keep-alive still works because chunked encoding
+        is self-delimiting.
+        """
         self.send_response(200)
         self.send_header('Content-Type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Transfer-Encoding', 'chunked')
         self.end_headers()
-        self.wfile.write(json.dumps(response, indent=2).encode('utf-8'))
+
+        pieces = []
+        buffered = 0
+        for piece in json.JSONEncoder(separators=(',', ':')).iterencode(response):
+            pieces.append(piece)
+            buffered += len(piece)
+            if buffered >= self.STREAM_CHUNK_SIZE:
+                self._write_chunk(''.join(pieces).encode('utf-8'))
+                pieces = []
+                buffered = 0
+
+        if pieces:
+            self._write_chunk(''.join(pieces).encode('utf-8'))
+
+        # Zero-length chunk terminates the response
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _write_chunk(self, chunk):
+        self.wfile.write(f'{len(chunk):x}\r\n'.encode('ascii'))
+        self.wfile.write(chunk)
+        self.wfile.write(b'\r\n')
+
+    # ============ GET handlers ============
+
+    def _api_status(self, query, data):
+        # Real status with actual uptime
+        global _uptime_cache
+        uptime_secs = int(time.monotonic() - SERVER_START_MONOTONIC)
+        if _uptime_cache[0] == uptime_secs:
+            uptime_str = _uptime_cache[1]
+        else:
+            # Whole seconds, so no microseconds to strip
+            uptime_str = str(timedelta(seconds=uptime_secs))
+            _uptime_cache = (uptime_secs, uptime_str)
+
+        return {
+            "status": "running",
+            "version": "0.7.2",
+            "uptime": uptime_str,
+            "controller": "Recira - Virtual Network Platform",
+            "hosts": len(ovs_manager.get_all_hosts()),
+            "switches": len(ovs_manager.get_all_switches()),
+            "networks": len(network_manager.get_all_networks()) if network_manager else 0,
+            "dhcp_enabled": len(dhcp_manager.get_all_dhcp_configs()) if dhcp_manager else 0
+        }
+
+    def _api_switches(self, query, data):
+        # Real switch data from OVS
+        switches = ovs_manager.get_all_switches()
+
+        # Add mock 'flows' field for now (will implement flow counting later)
+        for switch in switches:
+            switch['flows'] = 0  # Placeholder
+            switch['host'] = switch['host_ip']  # Add for compatibility
+
+        return {"switches": switches}
+
+    def _api_hosts(self, query, data):
+        # Real host data
+        hosts = ovs_manager.get_all_hosts()
+
+        # Format bridge names for display (make copies to avoid modifying original)
+        formatted_hosts = [
+            {
+                'id': host['id'],
+                'hostname': host['hostname'],
+                'ip': host['ip'],
+                'management_ip': host.get('management_ip', host['ip']),
+                'vxlan_ip': host.get('vxlan_ip', host['ip']),
+                'type': host.get('type', 'unknown'),
+                'status': host.get('status', 'unknown'),
+                'ovs_version': host.get('ovs_version', 'unknown'),
+                'bridges': [br['name'] for br in host.get('bridges', [])]
+            }
+            for host in hosts
+        ]
+
+        return {"hosts": formatted_hosts}
+
+    def _api_hosts_detached(self, query, data):
+        # Get detached hosts that can be re-attached
+        detached = ovs_manager.get_detached_hosts()
+        return {"detached_hosts": detached}
+
+    def _api_topology(self, query, data):
+        # Build topology from real switches (no links yet)
+        switches = ovs_manager.get_all_switches()
+
+        nodes = [
+            {
+                "id": switch['id'],
+                "type": "switch",
+                "name": f"{switch['name']}@{switch['hostname']}",
+                "dpid": switch['dpid']
+            }
+            for switch in switches
+        ]
+
+        return {
+            "nodes": nodes,
+            "links": []  # Will implement VXLAN link discovery in v0.3
+        }
+
+    def _api_tunnels(self, query, data):
+        # Get all VXLAN tunnels
+        if vxlan_manager:
+            tunnels = vxlan_manager.get_all_tunnels()
+            return {"tunnels": tunnels}
+        return _EMPTY_TUNNELS_BODY
+
+    def _api_networks(self, query, data):
+        # Get all virtual networks with DHCP status
+        if not network_manager:
+            return _EMPTY_NETWORKS_BODY
+
+        networks = network_manager.get_all_networks()
+        # Add DHCP status to each network (single bulk fetch, then O(1) lookups)
+        if dhcp_manager:
+            dhcp_configs = dhcp_manager.get_dhcp_config_map()
+            for net in networks:
+                dhcp_config = dhcp_configs.get(net['id'])
+                if dhcp_config:
+                    net['dhcp_enabled'] = True
+                    net['dhcp_host'] = dhcp_config.get('host_ip')
+                    # Range string is prebuilt when DHCP is enabled; the
+                    # fallback covers configs saved before it existed
+                    net['dhcp_range'] = (dhcp_config.get('dhcp_range') or
+                                         f"{dhcp_config.get('dhcp_start')} - {dhcp_config.get('dhcp_end')}")
+                else:
+                    net['dhcp_enabled'] = False
+        return {"networks": networks}
+
+    def _api_dhcp_config(self, query, data):
+        # Get DHCP configuration for a network (GET request)
+        params = parse_qs(query) if isinstance(query, str) else query
+        network_id = params.get('network_id', [None])[0] if isinstance(query, str) else query.get('network_id')
+
+        if not network_id:
+            return {"error": "Missing required parameter: network_id"}
+        if not dhcp_manager:
+            return {"error": "DHCP manager not initialized"}
+
+        config = dhcp_manager.get_dhcp_config(int(network_id))
+        if config:
+            return {"success": True, "dhcp_config": config}
+        return {"success": False, "message": "DHCP not enabled for this network"}
+
+    def _api_dhcp_leases(self, query, data):
+        # Get DHCP leases for a network (GET request)
+        params = parse_qs(query) if isinstance(query, str) else query
+        network_id = params.get('network_id', [None])[0] if isinstance(query, str) else query.get('network_id')
+        username = params.get('username', [None])[0] if isinstance(query, str) else query.get('username')
+        password = params.get('password', [None])[0] if isinstance(query, str) else query.get('password')
+
+        if not network_id:
+            return {"error": "Missing required parameter: network_id"}
+        if not dhcp_manager:
+            return {"error": "DHCP manager not initialized"}
+
+        return dhcp_manager.get_dhcp_leases(
+            network_id=int(network_id),
+            username=username,
+            password=password
+        )
+
+    def _api_hosts_health(self, query, data):
+        # Get health status of a specific host
+        params = parse_qs(query) if isinstance(query, str) else query
+        ip = params.get('ip', [None])[0] if isinstance(query, str) else query.get('ip')
+        username = params.get('username', ['root'])[0] if isinstance(query, str) else query.get('username', 'root')
+        password = params.get('password', [None])[0] if isinstance(query, str) else query.get('password')
+
+        if not ip:
+            return {"error": "Missing required parameter: ip"}
+
+        health_status = host_prov.get_host_status(
+            ip=ip,
+            username=username,
+            password=password
+        )
+        return {"health": health_status}
+
+    def _api_hosts_scan_interfaces(self, query, data):
+        # Scan network interfaces on a host
+        params = parse_qs(query) if isinstance(query, str) else query
+        ip = params.get('ip', [None])[0] if isinstance(query, str) else query.get('ip')
+        username = params.get('username', ['root'])[0] if isinstance(query, str) else query.get('username', 'root')
+        password = params.get('password', [None])[0] if isinstance(query, str) else query.get('password')
+
+        if not ip:
+            return {"error": "Missing required parameter: ip"}
+
+        return host_prov.scan_host_interfaces(
+            ip=ip,
+            username=username,
+            password=password
+        )
+
+    # ============ POST handlers ============
+
+    def _api_networks_create(self, query, data):
+        # Create a virtual network
+        name = data.get('name')
+        switches = data.get('switches', [])  # List of switch IDs
+        vni = data.get('vni')  # Optional
+        subnet = data.get('subnet', '')
+        gateway = data.get('gateway', '')
+
+        if not name:
+            return {"error": "Missing required field: name"}
+        if not switches or len(switches) < 2:
+            return {"error": "Network requires at least 2 switches"}
+        if not network_manager:
+            return {"error": "Network manager not initialized"}
+
+        network = network_manager.create_network(
+            name=name,
+            switches=switches,
+            vni=int(vni) if vni else None,
+            subnet=subnet,
+            gateway=gateway
+        )
+
+        if network:
+            return {
+                "success": True,
+                "message": f"Network '{name}' created successfully",
+                "network": network.to_dict()
+            }
+        return {
+            "success": False,
+            "error": "Failed to create network"
+        }
+
+    def _api_networks_delete(self, query, data):
+        # Delete a virtual network
+        network_id = data.get('network_id')
+
+        if not network_id:
+            return {"error": "Missing required field: network_id"}
+        if not network_manager:
+            return {"error": "Network manager not initialized"}
+
+        # Also disable DHCP if enabled
+        if dhcp_manager and dhcp_manager.get_dhcp_config(int(network_id)):
+            dhcp_manager.disable_dhcp(int(network_id))
+
+        success = network_manager.delete_network(int(network_id))
+
+        if success:
+            return {
+                "success": True,
+                "message": "Network deleted successfully"
+            }
+        return {
+            "success": False,
+            "error": "Failed to delete network (network not found?)"
+        }
+
+    # ============ DHCP API Endpoints (v0.7) ============
+
+    def _api_dhcp_enable(self, query, data):
+        # Enable DHCP for a network
+        network_id = data.get('network_id')
+        host_ip = data.get('host_ip')
+        dhcp_start = data.get('dhcp_start')
+        dhcp_end = data.get('dhcp_end')
+        username = data.get('username')
+        password = data.get('password')
+        dns_servers = data.get('dns_servers')
+        lease_time = data.get('lease_time', '24h')
+
+        if not network_id or not host_ip or not dhcp_start or not dhcp_end:
+            return {"error": "Missing required fields: network_id, host_ip, dhcp_start, dhcp_end"}
+        if not dhcp_manager:
+            return {"error": "DHCP manager not initialized"}
+
+        return dhcp_manager.enable_dhcp(
+            network_id=int(network_id),
+            host_ip=host_ip,
+            dhcp_start=dhcp_start,
+            dhcp_end=dhcp_end,
+            username=username,
+            password=password,
+            dns_servers=dns_servers,
+            lease_time=lease_time
+        )
+
+    def _api_dhcp_disable(self, query, data):
+        # Disable DHCP for a network
+        network_id = data.get('network_id')
+        username = data.get('username')
+        password = data.get('password')
+
+        if not network_id:
+            return {"error": "Missing required field: network_id"}
+        if not dhcp_manager:
+            return {"error": "DHCP manager not initialized"}
+
+        return dhcp_manager.disable_dhcp(
+            network_id=int(network_id),
+            username=username,
+            password=password
+        )
+
+    def _api_dhcp_reservation(self, query, data):
+        # Add DHCP reservation (POST request)
+        network_id = data.get('network_id')
+        mac = data.get('mac')
+        ip = data.get('ip')
+        hostname = data.get('hostname', '')
+        username = data.get('username')
+        password = data.get('password')
+
+        if not network_id or not mac or not ip:
+            return {"error": "Missing required fields: network_id, mac, ip"}
+        if not dhcp_manager:
+            return {"error": "DHCP manager not initialized"}
+
+        return dhcp_manager.add_reservation(
+            network_id=int(network_id),
+            mac=mac,
+            ip=ip,
+            hostname=hostname,
+            username=username,
+            password=password
+        )
+
+    def _api_dhcp_reservation_delete(self, query, data):
+        # Delete DHCP reservation (POST request)
+        network_id = data.get('network_id')
+        mac = data.get('mac')
+        username = data.get('username')
+        password = data.get('password')
+
+        if not network_id or not mac:
+            return {"error": "Missing required fields: network_id, mac"}
+        if not dhcp_manager:
+            return {"error": "DHCP manager not initialized"}
+
+        return dhcp_manager.delete_reservation(
+            network_id=int(network_id),
+            mac=mac,
+            username=username,
+            password=password
+        )
+
+    # ============ End DHCP API Endpoints ============
+
+    def _api_hosts_add(self, query, data):
+        # Add a remote host
+        ip = data.get('ip')
+        username = data.get('username', 'root')
+        password = data.get('password')
+        vxlan_ip = data.get('vxlan_ip')  # Optional VXLAN IP
+
+        if not ip or not password:
+            return {"error": "Missing required fields: ip, password"}
+
+        host_info = ovs_manager.discover_remote_host(
+            ip=ip,
+            username=username,
+            password=password,
+            vxlan_ip=vxlan_ip
+        )
+
+        if host_info:
+            # Filter out password from response
+            safe_host_info = {k: v for k, v in host_info.items() if k != 'ssh_password'}
+            return {
+                "success": True,
+                "message": f"Successfully added {host_info['hostname']}",
+                "host": safe_host_info
+            }
+        return {
+            "success": False,
+            "error": f"Failed to connect to {ip}"
+        }
+
+    def _api_hosts_provision(self, query, data):
+        # Auto-provision a host with OVS installation
+        ip = data.get('ip')
+        username = data.get('username', 'root')
+        password = data.get('password')
+        vxlan_interface = data.get('vxlan_interface')
+        vxlan_ip = data.get('vxlan_ip')
+        configure_mtu = data.get('configure_mtu', True)
+        optimize = data.get('optimize', True)
+
+        if not ip or not password:
+            return {"error": "Missing required fields: ip, password"}
+
+        # Run provisioning (this may take several minutes)
+        provision_result = host_prov.provision_new_host(
+            ip=ip,
+            username=username,
+            password=password,
+            vxlan_interface=vxlan_interface,
+            configure_mtu=configure_mtu,
+            optimize=optimize
+        )
+
+        if provision_result['success']:
+            # After provisioning, discover the host to add it to OVS manager
+            host_info = ovs_manager.discover_remote_host(
+                ip=ip,
+                username=username,
+                password=password,
+                vxlan_ip=vxlan_ip
+            )
+
+            # Filter out password from response
+            safe_host_info = {k: v for k, v in host_info.items() if k != 'ssh_password'} if host_info else None
+            return {
+                "success": True,
+                "message": f"Host {ip} provisioned successfully",
+                "provision_details": provision_result,
+                "host": safe_host_info
+            }
+        return {
+            "success": False,
+            "error": "Provisioning failed",
+            "details": provision_result
+        }
+
+    def _api_hosts_remove(self, query, data):
+        # Remove a host (detach or forget)
+        host_id = data.get('host_id')
+        keep_data = data.get('keep_data', False)  # True = detach, False = forget
+
+        if not host_id:
+            return {"error": "Missing required field: host_id"}
+
+        return ovs_manager.remove_host(int(host_id), keep_data=keep_data)
+
+    def _api_hosts_reattach(self, query, data):
+        # Re-attach a previously detached host
+        host_id = data.get('host_id')
+
+        if not host_id:
+            return {"error": "Missing required field: host_id"}
+
+        return ovs_manager.reattach_host(int(host_id))
+
+    def _api_tunnels_create(self, query, data):
+        # Create a VXLAN tunnel
+        src_switch_id = data.get('src_switch_id')
+        dst_switch_id = data.get('dst_switch_id')
+        vni = data.get('vni')  # Optional
+
+        if not src_switch_id or not dst_switch_id:
+            return {"error": "Missing required fields: src_switch_id, dst_switch_id"}
+        if not vxlan_manager:
+            return {"error": "VXLAN manager not initialized"}
+
+        tunnel_info = vxlan_manager.create_tunnel(
+            src_switch_id=int(src_switch_id),
+            dst_switch_id=int(dst_switch_id),
+            vni=int(vni) if vni else None
+        )
+
+        if tunnel_info:
+            return {
+                "success": True,
+                "message": f"Tunnel created successfully",
+                "tunnel": tunnel_info
+            }
+        return {
+            "success": False,
+            "error": "Failed to create tunnel"
+        }
+
+    def _api_tunnels_delete(self, query, data):
+        # Delete a VXLAN tunnel
+        tunnel_id = data.get('tunnel_id')
+
+        if not tunnel_id:
+            return {"error": "Missing required field: tunnel_id"}
+        if not vxlan_manager:
+            return {"error": "VXLAN manager not initialized"}
+
+        success = vxlan_manager.delete_tunnel(int(tunnel_id))
+
+        if success:
+            return {
+                "success": True,
+                "message": "Tunnel deleted successfully"
+            }
+        return {
+            "success": False,
+            "error": "Failed to delete tunnel (tunnel not found?)"
+        }
+
+    # Route tables: one hash lookup replaces the old if/elif chain
+    GET_ROUTES = {
+        '/api/status': _api_status,
+        '/api/switches': _api_switches,
+        '/api/hosts': _api_hosts,
+        '/api/hosts/detached': _api_hosts_detached,
+        '/api/topology': _api_topology,
+        '/api/tunnels': _api_tunnels,
+        '/api/networks': _api_networks,
+        '/api/dhcp/config': _api_dhcp_config,
+        '/api/dhcp/leases': _api_dhcp_leases,
+        '/api/hosts/health': _api_hosts_health,
+        '/api/hosts/scan-interfaces': _api_hosts_scan_interfaces,
+    }
+
+    POST_ROUTES = {
+        '/api/networks/create': _api_networks_create,
+        '/api/networks/delete': _api_networks_delete,
+        '/api/dhcp/enable': _api_dhcp_enable,
+        '/api/dhcp/disable': _api_dhcp_disable,
+        '/api/dhcp/reservation': _api_dhcp_reservation,
+        '/api/dhcp/reservation/delete': _api_dhcp_reservation_delete,
+        '/api/hosts/add': _api_hosts_add,
+        '/api/hosts/provision': _api_hosts_provision,
+        '/api/hosts/remove': _api_hosts_remove,
+        '/api/hosts/reattach': _api_hosts_reattach,
+        '/api/tunnels/create': _api_tunnels_create,
+        '/api/tunnels/delete': _api_tunnels_delete,
+    }
+
+    # Fused dispatch table keyed by (is_post, path) - built once at class
+    # definition so handle_api_request does a single dict probe
+    ROUTES = {(False, p): h for p, h in GET_ROUTES.items()}
+    ROUTES.update({(True, p): h for p, h in POST_ROUTES.items()})
 
     def log_message(self, format, *args):
-        """Custom log format"""
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        print(f"[{timestamp}] {self.address_string()} - {format % args}")
+        """Custom log format (queued to the background writer thread)"""
+        _log_queue.put(f"[{_log_timestamp()}] {self.address_string()} - {format % args}")
+
+
+class VXLANServer(http.server.ThreadingHTTPServer):
+    """Threaded HTTP server that supports multiple workers on one port
+
+    Each connection is handled on its own thread, so a slow operation
+    (host provisioning, SSH discovery) no longer blocks every other
+    client the way the old single-threaded TCPServer did.
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    # Deeper accept queue than the socketserver default of 5, so
+    # connection bursts from polling dashboards aren't refused
+    request_queue_size = 128
+
+    def server_bind(self):
+        # SO_REUSEPORT lets every worker process bind the same port so the
+        # kernel can spread accepted connections across them
+        if WORKERS > 1 and hasattr(socket, 'SO_REUSEPORT'):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
 
 
 def main():
@@ -632,9 +946,23 @@ def main():
     print("  POST /api/dhcp/reservation/delete - Delete reservation")
     print("="*60 + "\n")
 
-    # Allow port reuse to avoid "Address already in use" errors
-    socketserver.TCPServer.allow_reuse_address = True
-    with socketserver.TCPServer(("", PORT), VXLANRequestHandler) as httpd:
+    # Fork extra workers after manager init so each inherits the
+    # discovered state; every worker binds its own SO_REUSEPORT socket
+    if WORKERS > 1:
+        print(f"👷 Starting {WORKERS} worker processes (SO_REUSEPORT)")
+        print("⚠️  Workers do not share manager state: hosts/tunnels "
+              "created via one worker are invisible to the others and "
+              "tunnel ids can collide. Use WORKERS > 1 only for "
+              "read-mostly workloads.")
+        for _ in range(WORKERS - 1):
+            if os.fork() == 0:
+                # Re-create per-process resources the child cannot share
+                # with the parent before it starts serving
+                _start_log_writer(after_fork=True)
+                vxlan_manager.reset_after_fork()
+                break  # Child continues to serve below
+
+    with VXLANServer(("", PORT), VXLANRequestHandler) as httpd:
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+SSH Utilities - Shared SSH command builder with connection reuse
+
+All managers shell out to ssh/sshpass for remote hosts. Building the
+command here lets every call share OpenSSH ControlMaster multiplexing:
+the first command to a host opens the TCP + SSH session, subsequent
+commands ride the existing connection through a control socket, and the
+master closes itself after sitting idle (ControlPersist). That removes
+the handshake and key-exchange round trips from every API call.
+"""
+
+import atexit
+import hashlib
+import os
+import stat
+import tempfile
+import threading
+
+# Where the per-host control sockets live
+CONTROL_DIR = os.path.join(tempfile.gettempdir(), 'recira-ssh')
+
+# Keep idle master connections alive this long before they self-close
+CONTROL_PERSIST = '60'
+
+# Password files already written this process: {digest: path}
+_password_files = {}
+_password_files_lock = threading.Lock()
+
+
+def _cleanup_password_files():
+    """Remove the password files written by this process
+
+    Registered with atexit so credentials do not persist on disk after
+    the server stops. Stale files from a crashed process are overwritten
+    (same content, same digest-derived name) on the next start.
+    """
+    with _password_files_lock:
+        for path in _password_files.values():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        _password_files.clear()
+
+
+atexit.register(_cleanup_password_files)
+
+
+def _ensure_control_dir():
+    """Create CONTROL_DIR and verify it is safe to hold secrets
+
+    The directory lives in the shared temp dir, so a pre-existing entry
+    at this predictable path could belong to another local user - a
+    symlink or a wide-open directory they can plant files in. Refuse to
+    write control sockets or password files anywhere we do not own
+    exclusively.
+    """
+    os.makedirs(CONTROL_DIR, mode=0o700, exist_ok=True)
+    st = os.lstat(CONTROL_DIR)
+    if not stat.S_ISDIR(st.st_mode):
+        raise RuntimeError(f'{CONTROL_DIR} exists but is not a directory')
+    if st.st_uid != os.getuid():
+        raise RuntimeError(
+            f'{CONTROL_DIR} is owned by uid {st.st_uid}, refusing to use it')
+    if stat.S_IMODE(st.st_mode) & 0o077:
+        # Re-tighten permissions if the directory pre-existed looser
+        os.chmod(CONTROL_DIR, 0o700)
+
+
+def _password_file(password):
+    """Write the password to a 0600 file and return its path
+
+    'sshpass -p' puts the password on the child's argv, where any local
+    user can read it out of /proc. 'sshpass -f' reads it from a file that
+    only we can open. Files live in the 0700 control dir and are reused
+    for repeated calls with the same password.
+    """
+    digest = hashlib.sha256(password.encode('utf-8')).hexdigest()[:16]
+    with _password_files_lock:
+        path = _password_files.get(digest)
+        if path and os.path.exists(path):
+            return path
+        path = os.path.join(CONTROL_DIR, f'pw-{digest}')
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.write(fd, password.encode('utf-8') + b'\n')
+        finally:
+            os.close(fd)
+        _password_files[digest] = path
+        return path
+
+
+def build_ssh_cmd(ip, username='root', password=None, key_file=None,
+                  connect_timeout=10):
+    """Build an SSH command prefix with connection multiplexing
+
+    Args:
+        ip: Remote host IP
+        username: SSH username (default 'root')
+        password: SSH password (uses sshpass when given)
+        key_file: Optional private key path
+        connect_timeout: SSH ConnectTimeout in seconds
+
+    Returns:
+        List of command arguments ending with user@host; append the
+        remote command to execute.
+    """
+    _ensure_control_dir()
+
+    ssh_cmd = [
+        'ssh', '-o', 'StrictHostKeyChecking=no',
+        '-o', f'ConnectTimeout={connect_timeout}',
+        '-o', 'ControlMaster=auto',
+        '-o', f'ControlPath={CONTROL_DIR}/%r@%h:%p',
+        '-o', f'ControlPersist={CONTROL_PERSIST}',
+    ]
+
+    if key_file:
+        ssh_cmd.extend(['-i', key_file])
+
+    if password:
+        ssh_cmd = ['sshpass', '-f', _password_file(password)] + ssh_cmd
+
+    ssh_cmd.append(f'{username}@{ip}')
+    return ssh_cmd
@@ -3,151 +3,535 @@
 VXLAN Tunnel Manager - Creates and manages VXLAN tunnels between OVS bridges
 """
 
+import heapq
+import json
 import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 import re
 
+import ovsdb_client
+import ssh_utils
+
+# Pre-compiled patterns for scraping 'ovs-vsctl show' text (the fallback
+# path when JSON output is unavailable). Matching over the whole buffer
+# avoids the per-line split/strip/startswith churn of the old parser.
+_VSCTL_BRIDGE_RE = re.compile(r'^\s*Bridge\s+"?(\S+?)"?\s*$', re.M)
+# One VXLAN port block: from its 'Port' line to its 'options: {...}',
+# without crossing into the next Port/Bridge block
+_VSCTL_VXLAN_PORT_RE = re.compile(
+    r'Port\s+"?(\S+?)"?\s*\n'
+    r'(?:(?!\n\s*(?:Port|Bridge)\b).)*?'
+    r'type:\s*vxlan'
+    r'(?:(?!\n\s*(?:Port|Bridge)\b).)*?'
+    r'options:\s*\{([^}]*)\}',
+    re.S)
+_VSCTL_OPT_RE = re.compile(r'(\w+)="?([^",}]+)"?')
+
+
+class Tunnel:
+    """Represents a VXLAN tunnel between two switches
+
+    Uses __slots__ so each tunnel is a fixed-layout record instead of a
+    per-instance dict - cheaper to store and to walk when serializing
+    the tunnel list.
+    """
+
+    __slots__ = ('id', 'src_switch_id', 'dst_switch_id', 'src_switch_name',
+                 'dst_switch_name', 'src_host', 'dst_host', 'src_host_id',
+                 'dst_host_id', 'vni', 'src_vxlan_ip', 'dst_vxlan_ip',
+                 'tunnel_name_src', 'tunnel_name_dst', 'status', 'discovered')
+
+    def __init__(self, tunnel_id: int, src_switch_id: int, dst_switch_id: int,
+                 src_switch_name: str, dst_switch_name: str,
+                 src_host: str, dst_host: str, vni: int,
+                 src_vxlan_ip: str, dst_vxlan_ip: str,
+                 tunnel_name_src: str, tunnel_name_dst: str,
+                 src_host_id: int = None, dst_host_id: int = None,
+                 status: str = 'up', discovered: bool = False):
+        self.id = tunnel_id
+        self.src_switch_id = src_switch_id
+        self.dst_switch_id = dst_switch_id
+        self.src_host_id = src_host_id
+        self.dst_host_id = dst_host_id
+        self.src_switch_name = src_switch_name
+        self.dst_switch_name = dst_switch_name
+        self.src_host = src_host
+        self.dst_host = dst_host
+        self.vni = vni
+        self.src_vxlan_ip = src_vxlan_ip
+        self.dst_vxlan_ip = dst_vxlan_ip
+        self.tunnel_name_src = tunnel_name_src
+        self.tunnel_name_dst = tunnel_name_dst
+        self.status = status
+        self.discovered = discovered
+
+    def to_dict(self) -> dict:
+        """Convert to dictionary for JSON serialization"""
+        return {
+            'id': self.id,
+            'src_switch_id': self.src_switch_id,
+            'dst_switch_id': self.dst_switch_id,
+            'src_switch_name': self.src_switch_name,
+            'dst_switch_name': self.dst_switch_name,
+            'src_host': self.src_host,
+            'dst_host': self.dst_host,
+            'src_host_id': self.src_host_id,
+            'dst_host_id': self.dst_host_id,
+            'vni': self.vni,
+            'src_vxlan_ip': self.src_vxlan_ip,
+            'dst_vxlan_ip': self.dst_vxlan_ip,
+            'tunnel_name_src': self.tunnel_name_src,
+            'tunnel_name_dst': self.tunnel_name_dst,
+            'status': self.status,
+            'discovered': self.discovered
+        }
+
 
 class VXLANManager:
     """Manages VXLAN tunnels between OVS bridges"""
 
+    # How long host/switch snapshots from ovs_manager are reused before
+    # being rebuilt - tunnel operations do many lookups per call
+    SNAPSHOT_TTL = 2.0
+
     def __init__(self, ovs_manager):
         self.ovs_manager = ovs_manager
+        # Guards the tunnel table, VNI allocator, and snapshot rebuilds -
+        # the threaded server calls into this manager from many handler
+        # threads at once. Reentrant so helpers can nest freely.
+        self._lock = threading.RLock()
         self.tunnels = {}  # {tunnel_id: tunnel_info}
+        # Reverse index over canonical endpoints, kept in sync with
+        # self.tunnels so repeated discoveries dedup without re-walking it
+        self._tunnel_index = {}  # {(vni, lo_ip, hi_ip): tunnel_id}
         self.next_tunnel_id = 1
         self.next_vni = 100  # Start VNI from 100
+        # VNIs reclaimed from deleted tunnels, reused lowest-first so the
+        # 24-bit VNI space does not drift upward across create/delete
+        # cycles. The set mirrors the heap for O(1) membership checks.
+        self._free_vnis = []
+        self._freed_vnis = set()
+        self._hosts_cache = (0.0, None)  # (timestamp, hosts list)
+        self._switches_cache = (0.0, None)  # (timestamp, switches list)
+        self._ovsdb = None  # Pooled OVSDB connection (lazily opened)
+        # Parsed VXLAN ports per host, validated by the cur_cfg counter:
+        # {host_id: (cur_cfg, ports)}
+        self._vxlan_ports_cache = {}
+        # Lookup indexes, rebuilt whenever the snapshots refresh
+        self._host_by_id = {}
+        self._host_by_ip = {}  # Keyed by both vxlan_ip and management ip
+        self._switch_by_id = {}
+        self._switch_by_host_bridge = {}  # (host_id, bridge name) -> switch
+        self._first_switch_by_host = {}  # host_id -> first switch on host
+
+    def _get_hosts_snapshot(self) -> List[Dict]:
+        """Get all hosts, reusing a snapshot for up to SNAPSHOT_TTL seconds"""
+        with self._lock:
+            now = time.monotonic()
+            ts, hosts = self._hosts_cache
+            if hosts is not None and now - ts <= self.SNAPSHOT_TTL:
+                return hosts
+
+            hosts = self.ovs_manager.get_all_hosts()
+            self._hosts_cache = (now, hosts)
+
+            # Intern the strings that get copied onto every tunnel record:
+            # a K-host mesh holds O(K^2) tunnels but only O(K) distinct
+            # hostnames/IPs, so sharing one object per value keeps the
+            # tunnel table compact and makes dedup-key hashing cheaper
+            for host in hosts:
+                for key in ('hostname', 'ip', 'vxlan_ip'):
+                    if host.get(key):
+                        host[key] = sys.intern(host[key])
+
+            self._host_by_id = {host['id']: host for host in hosts}
+            # setdefault keeps first-match semantics when hosts share an IP
+            by_ip = {}
+            for host in hosts:
+                if host.get('vxlan_ip'):
+                    by_ip.setdefault(host['vxlan_ip'], host)
+                if host.get('ip'):
+                    by_ip.setdefault(host['ip'], host)
+            self._host_by_ip = by_ip
+        return hosts
+
+    def _get_switches_snapshot(self) -> List[Dict]:
+        """Get all switches, reusing a snapshot for up to SNAPSHOT_TTL seconds"""
+        with self._lock:
+            now = time.monotonic()
+            ts, switches = self._switches_cache
+            if switches is not None and now - ts <= self.SNAPSHOT_TTL:
+                return switches
+
+            switches = self.ovs_manager.get_all_switches()
+            self._switches_cache = (now, switches)
+
+            # Bridge names recur across tunnels the same way hostnames do
+            for switch in switches:
+                if switch.get('name'):
+                    switch['name'] = sys.intern(switch['name'])
+
+            self._switch_by_id = {switch['id']: switch for switch in switches}
+            self._switch_by_host_bridge = {
+                (switch['host_id'], switch['name']): switch for switch in switches
+            }
+            first = {}
+            for switch in switches:
+                first.setdefault(switch['host_id'], switch)
+            self._first_switch_by_host = first
+        return switches
 
     def discover_tunnels(self):
         """Discover existing VXLAN tunnels from all OVS bridges"""
         print("   Discovering existing VXLAN tunnels...")
         discovered = 0
 
-        # Track unique tunnels by (vni, local_ip, remote_ip) to avoid duplicates
-        seen_tunnels = set()
+        hosts = self._get_hosts_snapshot()
+
+        # Query every host in parallel - each query is an independent SSH
+        # or OVSDB round trip, so discovery time stays flat as hosts are
+        # added instead of growing linearly. Registration below remains
+        # sequential so tunnel IDs stay deterministic.
+        if len(hosts) > 1:
+            with ThreadPoolExecutor(max_workers=min(8, len(hosts))) as pool:
+                ports_per_host = list(pool.map(self._get_vxlan_ports, hosts))
+        else:
+            ports_per_host = [self._get_vxlan_ports(host) for host in hosts]
+
+        # Registration mutates the tunnel table, index, and VNI allocator,
+        # so it runs under the manager lock
+        with self._lock:
+            # Track unique tunnels by (vni, local_ip, remote_ip) to avoid
+            # duplicates - seeded with the already-known tunnels so
+            # re-running discovery does not register them again
+            seen_tunnels = set(self._tunnel_index)
+
+            for host, vxlan_ports in zip(hosts, ports_per_host):
+                host_ip = host.get('vxlan_ip') or host.get('ip')
+                # Suffix is per-host, not per-port - compute it once
+                src_ip_suffix = host_ip.rsplit('.', 1)[-1]
+
+                for port_info in vxlan_ports:
+                    vni = port_info['vni']
+                    remote_ip = port_info['remote_ip']
+                    bridge = port_info['bridge']
+                    port_name = port_info['port_name']
+
+                    # Create a canonical key (smaller IP first) to dedupe bidirectional tunnels
+                    tunnel_key = self._tunnel_key(vni, host_ip, remote_ip)
+
+                    if tunnel_key in seen_tunnels:
+                        continue
+                    seen_tunnels.add(tunnel_key)
+
+                    # Find the remote host
+                    remote_host = self._find_host_by_vxlan_ip(remote_ip)
+                    if not remote_host:
+                        # Remote host not managed by us, skip
+                        continue
+
+                    # Find switches
+                    src_switch = self._find_switch_on_host(host['id'], bridge)
+                    dst_switch = self._find_switch_on_host_by_vxlan_ip(remote_ip)
+
+                    if not src_switch or not dst_switch:
+                        continue
+
+                    # Calculate port names
+                    dst_ip_suffix = remote_ip.rsplit('.', 1)[-1]
+
+                    tunnel = Tunnel(
+                        tunnel_id=self.next_tunnel_id,
+                        src_switch_id=src_switch['id'],
+                        dst_switch_id=dst_switch['id'],
+                        src_switch_name=src_switch['name'],
+                        dst_switch_name=dst_switch['name'],
+                        src_host=host['hostname'],
+                        dst_host=remote_host['hostname'],
+                        src_host_id=host['id'],
+                        dst_host_id=remote_host['id'],
+                        vni=vni,
+                        src_vxlan_ip=host_ip,
+                        dst_vxlan_ip=remote_ip,
+                        tunnel_name_src=f"vxlan{vni}_{dst_ip_suffix}",
+                        tunnel_name_dst=f"vxlan{vni}_{src_ip_suffix}",
+                        discovered=True
+                    )
+
+                    self.tunnels[self.next_tunnel_id] = tunnel
+                    self._tunnel_index[tunnel_key] = self.next_tunnel_id
+                    self.next_tunnel_id += 1
+                    discovered += 1
+
+                    # Keep the allocator clear of in-use VNIs
+                    self._reserve_vni(vni)
 
-        hosts = self.ovs_manager.get_all_hosts()
-        for host in hosts:
-            host_ip = host.get('vxlan_ip') or host.get('ip')
-            vxlan_ports = self._get_vxlan_ports(host)
+        print(f"      Discovered {discovered} existing tunnel(s)")
+        return discovered
 
-            for port_info in vxlan_ports:
-                vni = port_info['vni']
-                remote_ip = port_info['remote_ip']
-                bridge = port_info['bridge']
-                port_name = port_info['port_name']
+    def reset_after_fork(self):
+        """Drop per-process resources inherited across fork()
 
-                # Create a canonical key (smaller IP first) to dedupe bidirectional tunnels
-                ips = tuple(sorted([host_ip, remote_ip]))
-                tunnel_key = (vni, ips[0], ips[1])
+        The pooled OVSDB connection is a connected unix-socket FD; if
+        worker processes kept the one opened by startup discovery, their
+        transactions would interleave on a single stream (the client's
+        threading.Lock cannot serialize across processes). Each child
+        drops it here and lazily opens its own on first use.
+        """
+        with self._lock:
+            if self._ovsdb is not None:
+                self._ovsdb.close()
+                self._ovsdb = None
+
+    def _allocate_vni(self) -> int:
+        """Get the lowest free VNI, preferring reclaimed ones"""
+        with self._lock:
+            while self._free_vnis:
+                vni = heapq.heappop(self._free_vnis)
+                if vni in self._freed_vnis:
+                    # Stale heap entries (reserved after release) are skipped
+                    self._freed_vnis.discard(vni)
+                    return vni
+            vni = self.next_vni
+            self.next_vni += 1
+            return vni
 
-                if tunnel_key in seen_tunnels:
-                    continue
-                seen_tunnels.add(tunnel_key)
+    def _reserve_vni(self, vni: int):
+        """Mark an externally-chosen or discovered VNI as in use"""
+        with self._lock:
+            self._freed_vnis.discard(vni)  # Lazily dropped from the heap on pop
+            if vni >= self.next_vni:
+                self.next_vni = vni + 1
 
-                # Find the remote host
-                remote_host = self._find_host_by_vxlan_ip(remote_ip)
-                if not remote_host:
-                    # Remote host not managed by us, skip
-                    continue
+    def _release_vni(self, vni: int):
+        """Return a VNI to the free list if no remaining tunnel uses it
 
-                # Find switches
-                src_switch = self._find_switch_on_host(host['id'], bridge)
-                dst_switch = self._find_switch_on_host_by_vxlan_ip(remote_ip)
+        Full-mesh networks share one VNI across many tunnels, so the VNI
+        is only reclaimable once the last of them is gone.
+        """
+        with self._lock:
+            if vni in self._freed_vnis:
+                return
+            if any(t.vni == vni for t in self.tunnels.values()):
+                return
+            self._freed_vnis.add(vni)
+            heapq.heappush(self._free_vnis, vni)
+
+    @staticmethod
+    def _tunnel_key(vni: int, ip_a: str, ip_b: str) -> Tuple[int, str, str]:
+        """Canonical (vni, lo_ip, hi_ip) identity of a bidirectional tunnel"""
+        return (vni, ip_a, ip_b) if ip_a < ip_b else (vni, ip_b, ip_a)
 
-                if not src_switch or not dst_switch:
-                    continue
+    def _get_vxlan_ports(self, host: Dict) -> List[Dict]:
+        """Get all VXLAN ports from a host's bridges
 
-                # Calculate port names
-                dst_ip_suffix = remote_ip.split('.')[-1]
-                src_ip_suffix = host_ip.split('.')[-1]
-
-                tunnel_info = {
-                    'id': self.next_tunnel_id,
-                    'src_switch_id': src_switch['id'],
-                    'dst_switch_id': dst_switch['id'],
-                    'src_switch_name': src_switch['name'],
-                    'dst_switch_name': dst_switch['name'],
-                    'src_host': host['hostname'],
-                    'dst_host': remote_host['hostname'],
-                    'vni': vni,
-                    'src_vxlan_ip': host_ip,
-                    'dst_vxlan_ip': remote_ip,
-                    'tunnel_name_src': f"vxlan{vni}_{dst_ip_suffix}",
-                    'tunnel_name_dst': f"vxlan{vni}_{src_ip_suffix}",
-                    'status': 'up',
-                    'discovered': True
-                }
-
-                self.tunnels[self.next_tunnel_id] = tunnel_info
-                self.next_tunnel_id += 1
-                discovered += 1
-
-                # Update next_vni to avoid conflicts
-                if vni >= self.next_vni:
-                    self.next_vni = vni + 1
+        For localhost, queries ovsdb-server directly over its unix socket
+        (no ovs-vsctl fork, no text scraping); falls back to parsing
+        'ovs-vsctl show' if the socket is unavailable. Remote hosts always
+        go through SSH + ovs-vsctl.
 
-        print(f"      Discovered {discovered} existing tunnel(s)")
-        return discovered
+        Results are cached per host and validated against the cur_cfg
+        counter (bumped by every OVS transaction), so re-running discovery
+        against an unchanged host costs one cheap counter fetch instead of
+        a full table dump.
+        """
+        cur_cfg = self._get_ovs_config_version(host)
+        if cur_cfg is not None:
+            cached = self._vxlan_ports_cache.get(host['id'])
+            if cached is not None and cached[0] == cur_cfg:
+                return cached[1]
+
+        ports = self._get_vxlan_ports_uncached(host)
+        if cur_cfg is not None:
+            self._vxlan_ports_cache[host['id']] = (cur_cfg, ports)
+        return ports
+
+    def _get_ovs_config_version(self, host: Dict) -> Optional[str]:
+        """Fetch the host's cur_cfg counter (cheap cache validator)
+
+        Returns None if the fetch fails, in which case callers skip the
+        cache rather than risk serving stale data.
+        """
+        try:
+            cmd = ['ovs-vsctl', '--no-wait', 'get', 'Open_vSwitch', '.', 'cur_cfg']
+            if host['type'] != 'localhost':
+                cmd = self._build_ssh_cmd(host) + cmd
+            return subprocess.run(cmd, capture_output=True, text=True,
+                                  timeout=10, check=True).stdout.strip()
+        except Exception:
+            return None
+
+    def _get_vxlan_ports_uncached(self, host: Dict) -> List[Dict]:
+        """Scrape a host's VXLAN ports, trying the structured paths first"""
+        if host['type'] == 'localhost':
+            try:
+                return self._get_vxlan_ports_ovsdb()
+            except ovsdb_client.OVSDBError:
+                pass  # No OVSDB socket - use the ovs-vsctl path below
+        else:
+            try:
+                return self._get_vxlan_ports_remote_json(host)
+            except (subprocess.SubprocessError, ValueError, KeyError, OSError):
+                pass  # Old ovs-vsctl without --format=json, or SSH hiccup
+        return self._get_vxlan_ports_vsctl(host)
+
+    def _join_vxlan_ports(self, bridge_rows: List[Dict], port_rows: List[Dict],
+                          iface_rows: List[Dict]) -> List[Dict]:
+        """Join Bridge/Port/Interface rows into the VXLAN port list
+
+        Rows use OVSDB JSON value encoding (['uuid', ...], ['set', ...],
+        ['map', ...]) whether they came from the OVSDB socket or from
+        'ovs-vsctl --format=json'.
+        """
+        ports_by_uuid = {ovsdb_client.unwrap(row['_uuid']): row
+                         for row in port_rows}
+        ifaces_by_uuid = {ovsdb_client.unwrap(row['_uuid']): row
+                          for row in iface_rows}
 
-    def _get_vxlan_ports(self, host: Dict) -> List[Dict]:
-        """Get all VXLAN ports from a host's bridges"""
         vxlan_ports = []
+        for bridge in bridge_rows:
+            for port_uuid in ovsdb_client.atoms(bridge['ports']):
+                port = ports_by_uuid.get(port_uuid)
+                if not port:
+                    continue
+                for iface_uuid in ovsdb_client.atoms(port['interfaces']):
+                    iface = ifaces_by_uuid.get(iface_uuid)
+                    if not iface or iface.get('type') != 'vxlan':
+                        continue
+                    options = ovsdb_client.to_map(iface.get('options'))
+                    try:
+                        vni = int(options.get('key', '0') or 0)
+                    except (TypeError, ValueError):
+                        # options:key=flow is valid OVS config (VNI taken
+                        # from the flow table) - not a point-to-point
+                        # tunnel we can register, so skip it
+                        continue
+                    remote_ip = options.get('remote_ip', '')
+                    if vni and remote_ip:
+                        vxlan_ports.append({
+                            'bridge': bridge['name'],
+                            'port_name': port['name'],
+                            'vni': vni,
+                            'remote_ip': remote_ip
+                        })
+        return vxlan_ports
+
+    def _get_vxlan_ports_remote_json(self, host: Dict) -> List[Dict]:
+        """Get a remote host's VXLAN ports via ovs-vsctl JSON output
+
+        One SSH call dumps the three tables as JSON ('--format=json'
+        emits {headings, data} objects back to back), which is parsed
+        structurally instead of scraping 'ovs-vsctl show' text. The
+        output is consumed from the pipe as it arrives, so completed
+        tables are decoded while later ones are still in flight.
+        """
+        cmd = self._build_ssh_cmd(host) + [
+            'ovs-vsctl', '--format=json',
+            'list', 'Bridge', '--', 'list', 'Port', '--', 'list', 'Interface'
+        ]
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, text=True)
+        decoder = json.JSONDecoder()
+        tables = []
+        buffer = ''
         try:
-            if host['type'] == 'localhost':
-                cmd = ['ovs-vsctl', 'show']
-                result = subprocess.check_output(cmd, text=True)
-            else:
-                ssh_cmd = self._build_ssh_cmd(host)
-                cmd = ssh_cmd + ['ovs-vsctl', 'show']
-                result = subprocess.check_output(cmd, text=True, stderr=subprocess.DEVNULL)
-
-            # Parse ovs-vsctl show output
-            current_bridge = None
-            current_port = None
-            current_type = None
-            current_options = {}
-
-            for line in result.split('\n'):
-                line = line.strip()
-                if line.startswith('Bridge '):
-                    current_bridge = line.split()[1].strip('"')
-                elif line.startswith('Port '):
-                    # Save previous port if it was vxlan
-                    if current_port and current_type == 'vxlan' and 'remote_ip' in current_options:
-                        vni = int(current_options.get('key', '0').strip('"'))
-                        remote_ip = current_options.get('remote_ip', '').strip('"')
-                        if vni and remote_ip:
-                            vxlan_ports.append({
-                                'bridge': current_bridge,
-                                'port_name': current_port,
-                                'vni': vni,
-                                'remote_ip': remote_ip
-                            })
-                    current_port = line.split()[1].strip('"')
-                    current_type = None
-                    current_options = {}
-                elif line.startswith('type: '):
-                    current_type = line.split(': ')[1]
-                elif line.startswith('options: '):
-                    # Parse options: {key="1003", remote_ip="10.172.88.233"}
-                    opts_str = line.split(': ', 1)[1]
-                    opts_str = opts_str.strip('{}')
-                    for opt in opts_str.split(', '):
-                        if '=' in opt:
-                            k, v = opt.split('=', 1)
-                            current_options[k] = v.strip('"')
-
-            # Don't forget last port
-            if current_port and current_type == 'vxlan' and 'remote_ip' in current_options:
-                vni = int(current_options.get('key', '0').strip('"'))
-                remote_ip = current_options.get('remote_ip', '').strip('"')
-                if vni and remote_ip:
-                    vxlan_ports.append({
-                        'bridge': current_bridge,
-                        'port_name': current_port,
-                        'vni': vni,
-                        'remote_ip': remote_ip
-                    })
+            for chunk in iter(lambda: proc.stdout.read(65536), ''):
+                buffer += chunk
+                # Pull out any table objects that are now complete
+                while True:
+                    buffer = buffer.lstrip()
+                    if not buffer:
+                        break
+                    try:
+                        table, end = decoder.raw_decode(buffer)
+                    except ValueError:
+                        break  # Partial object - wait for more output
+                    tables.append(table)
+                    buffer = buffer[end:]
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait(timeout=30)
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd)
+        if len(tables) != 3:
+            raise ValueError(f'expected 3 table dumps, got {len(tables)}')
+
+        def rows(table):
+            headings = table['headings']
+            return [dict(zip(headings, data)) for data in table['data']]
+
+        bridge_rows, port_rows, iface_rows = (rows(t) for t in tables)
+        return self._join_vxlan_ports(bridge_rows, port_rows, iface_rows)
+
+    def _get_vxlan_ports_ovsdb(self) -> List[Dict]:
+        """Get localhost VXLAN ports via one batched OVSDB transaction
+
+        The OVSDB connection is pooled on the manager: it is opened on
+        first use and reused by later calls, with one reconnect attempt
+        if the pooled socket has gone stale.
+        """
+        ops = (
+            {'op': 'select', 'table': 'Bridge', 'where': [],
+             'columns': ['name', 'ports']},
+            {'op': 'select', 'table': 'Port', 'where': [],
+             'columns': ['_uuid', 'name', 'interfaces']},
+            {'op': 'select', 'table': 'Interface', 'where': [],
+             'columns': ['_uuid', 'name', 'type', 'options']},
+        )
+
+        if self._ovsdb is None:
+            self._ovsdb = ovsdb_client.OVSDBClient()
+            bridge_res, port_res, iface_res = self._ovsdb.transact(*ops)
+        else:
+            try:
+                bridge_res, port_res, iface_res = self._ovsdb.transact(*ops)
+            except ovsdb_client.OVSDBError:
+                # Pooled connection went stale (ovsdb-server restart?) -
+                # transact reopens the socket on the retry
+                bridge_res, port_res, iface_res = self._ovsdb.transact(*ops)
+
+        return self._join_vxlan_ports(bridge_res['rows'], port_res['rows'],
+                                      iface_res['rows'])
+
+    def _get_vxlan_ports_vsctl(self, host: Dict) -> List[Dict]:
+        """Get VXLAN ports by parsing 'ovs-vsctl show' output"""
+        vxlan_ports = []
+        try:
+            cmd = ['ovs-vsctl', 'show']
+            if host['type'] != 'localhost':
+                cmd = self._build_ssh_cmd(host) + cmd
+            result = subprocess.run(cmd, capture_output=True, text=True,
+                                    check=True).stdout
+
+            # Scan the whole buffer with the pre-compiled patterns: find
+            # each Bridge section, then every VXLAN port block inside it
+            bridge_matches = list(_VSCTL_BRIDGE_RE.finditer(result))
+            for i, bridge_match in enumerate(bridge_matches):
+                section_end = (bridge_matches[i + 1].start()
+                               if i + 1 < len(bridge_matches) else len(result))
+                section = result[bridge_match.start():section_end]
+
+                for port_match in _VSCTL_VXLAN_PORT_RE.finditer(section):
+                    options = dict(_VSCTL_OPT_RE.findall(port_match.group(2)))
+                    try:
+                        vni = int(options.get('key', '0') or 0)
+                    except (TypeError, ValueError):
+                        # options:key=flow is valid OVS config (VNI taken
+                        # from the flow table) - not a point-to-point
+                        # tunnel we can register, so skip it
+                        continue
+                    remote_ip = options.get('remote_ip', '')
+                    if vni and remote_ip:
+                        vxlan_ports.append({
+                            'bridge': bridge_match.group(1),
+                            'port_name': port_match.group(1),
+                            'vni': vni,
+                            'remote_ip': remote_ip
+                        })
 
         except Exception as e:
             print(f"      Error getting VXLAN ports from {host['hostname']}: {e}")
@@ -155,31 +539,22 @@ class VXLANManager:
         return vxlan_ports
 
     def _find_host_by_vxlan_ip(self, vxlan_ip: str) -> Optional[Dict]:
-        """Find a host by its VXLAN IP"""
-        hosts = self.ovs_manager.get_all_hosts()
-        for host in hosts:
-            if host.get('vxlan_ip') == vxlan_ip or host.get('ip') == vxlan_ip:
-                return host
-        return None
+        """Find a host by its VXLAN IP (or management IP)"""
+        self._get_hosts_snapshot()
+        return self._host_by_ip.get(vxlan_ip)
 
     def _find_switch_on_host(self, host_id: int, bridge_name: str) -> Optional[Dict]:
         """Find a switch by host ID and bridge name"""
-        switches = self.ovs_manager.get_all_switches()
-        for switch in switches:
-            if switch['host_id'] == host_id and switch['name'] == bridge_name:
-                return switch
-        return None
+        self._get_switches_snapshot()
+        return self._switch_by_host_bridge.get((host_id, bridge_name))
 
     def _find_switch_on_host_by_vxlan_ip(self, vxlan_ip: str) -> Optional[Dict]:
         """Find the first switch on a host identified by VXLAN IP"""
         host = self._find_host_by_vxlan_ip(vxlan_ip)
         if not host:
             return None
-        switches = self.ovs_manager.get_all_switches()
-        for switch in switches:
-            if switch['host_id'] == host['id']:
-                return switch
-        return None
+        self._get_switches_snapshot()
+        return self._first_switch_by_host.get(host['id'])
 
     def create_tunnel(self, src_switch_id: int, dst_switch_id: int,
                      vni: Optional[int] = None) -> Optional[Dict]:
@@ -195,18 +570,19 @@ class VXLANManager:
             Tunnel info dict or None on failure
         """
         # Get switch info
-        switches = self.ovs_manager.get_all_switches()
-        src_switch = next((s for s in switches if s['id'] == src_switch_id), None)
-        dst_switch = next((s for s in switches if s['id'] == dst_switch_id), None)
+        src_switch = self._get_switch_by_id(src_switch_id)
+        dst_switch = self._get_switch_by_id(dst_switch_id)
 
         if not src_switch or not dst_switch:
             print(f"Error: Could not find switches {src_switch_id} or {dst_switch_id}")
             return None
 
         # Auto-assign VNI if not provided
-        if vni is None:
-            vni = self.next_vni
-            self.next_vni += 1
+        auto_vni = vni is None
+        if auto_vni:
+            vni = self._allocate_vni()
+        else:
+            self._reserve_vni(vni)
 
         # Get host info to determine if local or remote
         src_host = self._get_host_by_id(src_switch['host_id'])
@@ -214,6 +590,8 @@ class VXLANManager:
 
         if not src_host or not dst_host:
             print("Error: Could not find host information")
+            if auto_vni:
+                self._release_vni(vni)
             return None
 
         # Determine VXLAN endpoint IPs (use 10.172.88.x network)
@@ -222,60 +600,95 @@ class VXLANManager:
 
         if not src_vxlan_ip or not dst_vxlan_ip:
             print("Error: Could not determine VXLAN endpoint IPs")
+            if auto_vni:
+                self._release_vni(vni)
             return None
 
         # Create unique tunnel names (include remote IP last octet to avoid conflicts)
         # For multiple tunnels with same VNI, we need unique port names
-        dst_ip_suffix = dst_vxlan_ip.split('.')[-1]  # Get last octet of remote IP
-        src_ip_suffix = src_vxlan_ip.split('.')[-1]
+        dst_ip_suffix = dst_vxlan_ip.rsplit('.', 1)[-1]  # Get last octet of remote IP
+        src_ip_suffix = src_vxlan_ip.rsplit('.', 1)[-1]
         tunnel_name_src = f"vxlan{vni}_{dst_ip_suffix}"  # e.g., vxlan1009_233
         tunnel_name_dst = f"vxlan{vni}_{src_ip_suffix}"  # e.g., vxlan1009_234
 
         # Create VXLAN interface on source switch
         print(f"Creating VXLAN tunnel: {src_switch['name']}@{src_host['hostname']} -> {dst_switch['name']}@{dst_host['hostname']}")
         print(f"  VNI: {vni}, Remote IP: {dst_vxlan_ip}, Port: {tunnel_name_src}")
-
-        if not self._add_vxlan_port(src_host, src_switch['name'], tunnel_name_src, dst_vxlan_ip, vni):
-            print("Error: Failed to create VXLAN port on source switch")
-            return None
-
-        # Create reverse tunnel on destination switch
         print(f"Creating reverse tunnel: {dst_switch['name']}@{dst_host['hostname']} -> {src_switch['name']}@{src_host['hostname']}")
         print(f"  VNI: {vni}, Remote IP: {src_vxlan_ip}, Port: {tunnel_name_dst}")
 
-        if not self._add_vxlan_port(dst_host, dst_switch['name'], tunnel_name_dst, src_vxlan_ip, vni):
-            print("Error: Failed to create VXLAN port on destination switch")
-            # Cleanup source port
-            self._del_vxlan_port(src_host, src_switch['name'], tunnel_name_src)
-            return None
-
-        # Store tunnel info
-        tunnel_info = {
-            'id': self.next_tunnel_id,
-            'src_switch_id': src_switch_id,
-            'dst_switch_id': dst_switch_id,
-            'src_switch_name': src_switch['name'],
-            'dst_switch_name': dst_switch['name'],
-            'src_host': src_host['hostname'],
-            'dst_host': dst_host['hostname'],
-            'vni': vni,
-            'src_vxlan_ip': src_vxlan_ip,
-            'dst_vxlan_ip': dst_vxlan_ip,
-            'tunnel_name_src': tunnel_name_src,
-            'tunnel_name_dst': tunnel_name_dst,
-            'status': 'up'
-        }
-
-        self.tunnels[self.next_tunnel_id] = tunnel_info
-        self.next_tunnel_id += 1
+        src_args = self._vxlan_port_args(src_switch['name'], tunnel_name_src, dst_vxlan_ip, vni)
+        dst_args = self._vxlan_port_args(dst_switch['name'], tunnel_name_dst, src_vxlan_ip, vni)
+
+        if src_host['id'] == dst_host['id']:
+            # Both endpoints on one host: chain the adds with '--' so a
+            # single ovs-vsctl transaction (one SSH session for remote
+            # hosts) creates both ports atomically
+            if not self._run_ovs_vsctl(src_host, src_args + ['--'] + dst_args):
+                print("Error: Failed to create VXLAN ports")
+                if auto_vni:
+                    self._release_vni(vni)
+                return None
+        else:
+            # Different hosts: the two adds are independent, so issue them
+            # concurrently and wait for both instead of paying two SSH
+            # round trips back to back
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                src_future = pool.submit(self._run_ovs_vsctl, src_host, src_args)
+                dst_future = pool.submit(self._run_ovs_vsctl, dst_host, dst_args)
+                src_ok = src_future.result()
+                dst_ok = dst_future.result()
+
+            if not src_ok or not dst_ok:
+                print("Error: Failed to create VXLAN port on "
+                      f"{'source' if not src_ok else 'destination'} switch")
+                # Cleanup whichever endpoint did get created
+                if src_ok:
+                    self._del_vxlan_port(src_host, src_switch['name'], tunnel_name_src)
+                if dst_ok:
+                    self._del_vxlan_port(dst_host, dst_switch['name'], tunnel_name_dst)
+                if auto_vni:
+                    self._release_vni(vni)
+                return None
+
+        # Store tunnel info (id assignment and table/index inserts happen
+        # atomically so overlapping creates cannot share an id)
+        with self._lock:
+            tunnel_id = self.next_tunnel_id
+            self.next_tunnel_id += 1
+
+            tunnel = Tunnel(
+                tunnel_id=tunnel_id,
+                src_switch_id=src_switch_id,
+                dst_switch_id=dst_switch_id,
+                src_switch_name=src_switch['name'],
+                dst_switch_name=dst_switch['name'],
+                src_host=src_host['hostname'],
+                dst_host=dst_host['hostname'],
+                src_host_id=src_host['id'],
+                dst_host_id=dst_host['id'],
+                vni=vni,
+                src_vxlan_ip=src_vxlan_ip,
+                dst_vxlan_ip=dst_vxlan_ip,
+                tunnel_name_src=tunnel_name_src,
+                tunnel_name_dst=tunnel_name_dst
+            )
+
+            self.tunnels[tunnel_id] = tunnel
+            self._tunnel_index[self._tunnel_key(vni, src_vxlan_ip, dst_vxlan_ip)] = \
+                tunnel_id
+
+        # The port lists for these hosts just changed
+        self._vxlan_ports_cache.pop(src_host['id'], None)
+        self._vxlan_ports_cache.pop(dst_host['id'], None)
 
         print(f"✅ Tunnel created successfully!")
-        return tunnel_info
+        return tunnel.to_dict()
 
     def _get_host_by_id(self, host_id: int) -> Optional[Dict]:
         """Get host info by host ID"""
-        hosts = self.ovs_manager.get_all_hosts()
-        return next((h for h in hosts if h['id'] == host_id), None)
+        self._get_hosts_snapshot()
+        return self._host_by_id.get(host_id)
 
     def _get_vxlan_ip(self, host: Dict) -> Optional[str]:
         """Get the VXLAN endpoint IP for a host"""
@@ -287,72 +700,69 @@ class VXLANManager:
         # Fall back to management IP (for backward compatibility)
         return host.get('ip')
 
-    def _add_vxlan_port(self, host: Dict, bridge_name: str, port_name: str,
-                       remote_ip: str, vni: int) -> bool:
-        """Add a VXLAN port to a bridge"""
+    def _vxlan_port_args(self, bridge_name: str, port_name: str,
+                         remote_ip: str, vni: int) -> List[str]:
+        """Build the ovs-vsctl arguments for one VXLAN port add"""
+        return [
+            'add-port', bridge_name, port_name, '--',
+            'set', 'interface', port_name, 'type=vxlan',
+            f'options:remote_ip={remote_ip}',
+            f'options:key={vni}'
+        ]
+
+    def _run_ovs_vsctl(self, host: Dict, args: List[str]) -> bool:
+        """Run a single ovs-vsctl transaction on a host (local or SSH)"""
         try:
             if host['type'] == 'localhost':
-                # Local execution
-                cmd = [
-                    'ovs-vsctl', 'add-port', bridge_name, port_name, '--',
-                    'set', 'interface', port_name, 'type=vxlan',
-                    f'options:remote_ip={remote_ip}',
-                    f'options:key={vni}'
-                ]
-                subprocess.check_call(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                cmd = ['ovs-vsctl'] + args
             else:
-                # Remote execution via SSH
-                ssh_cmd = self._build_ssh_cmd(host)
-                cmd = ssh_cmd + [
-                    'ovs-vsctl', 'add-port', bridge_name, port_name, '--',
-                    'set', 'interface', port_name, 'type=vxlan',
-                    f'options:remote_ip={remote_ip}',
-                    f'options:key={vni}'
-                ]
-                subprocess.check_call(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
+                cmd = self._build_ssh_cmd(host) + ['ovs-vsctl'] + args
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                error = result.stderr.strip() or f'exit status {result.returncode}'
+                print(f"Error running ovs-vsctl on {host.get('hostname', host.get('ip'))}: {error}")
+                return False
             return True
         except Exception as e:
-            print(f"Error adding VXLAN port: {e}")
+            print(f"Error running ovs-vsctl on {host.get('hostname', host.get('ip'))}: {e}")
             return False
 
+    def _add_vxlan_port(self, host: Dict, bridge_name: str, port_name: str,
+                       remote_ip: str, vni: int) -> bool:
+        """Add a VXLAN port to a bridge"""
+        return self._run_ovs_vsctl(
+            host, self._vxlan_port_args(bridge_name, port_name, remote_ip, vni))
+
     def _del_vxlan_port(self, host: Dict, bridge_name: str, port_name: str) -> bool:
         """Delete a VXLAN port from a bridge"""
-        try:
-            if host['type'] == 'localhost':
-                cmd = ['ovs-vsctl', 'del-port', bridge_name, port_name]
-                subprocess.check_call(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            else:
-                ssh_cmd = self._build_ssh_cmd(host)
-                cmd = ssh_cmd + ['ovs-vsctl', 'del-port', bridge_name, port_name]
-                subprocess.check_call(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-            return True
-        except Exception as e:
-            print(f"Error deleting VXLAN port: {e}")
-            return False
+        return self._run_ovs_vsctl(host, ['del-port', bridge_name, port_name])
 
     def _build_ssh_cmd(self, host: Dict) -> List[str]:
-        """Build SSH command for remote host using stored credentials"""
+        """Build SSH command for remote host using stored credentials
+
+        Goes through ssh_utils so the connection is multiplexed via
+        ControlMaster - tunnel operations against the same host reuse
+        one SSH session instead of handshaking per ovs-vsctl call.
+        """
         # Get credentials from ovs_manager
         username, password = self.ovs_manager.get_host_credentials(host.get('ip'))
-        if not password:
-            # Fallback for backward compatibility
-            password = 'Xm9909ona'
         if not username:
             username = 'root'
-        ssh_cmd = ['sshpass', '-p', password, 'ssh', '-o', 'StrictHostKeyChecking=no']
-        ssh_cmd.append(f"{username}@{host['ip']}")
-        return ssh_cmd
+        # No stored password: rely on SSH keys / ssh-agent instead of
+        # falling back to a baked-in credential
+        return ssh_utils.build_ssh_cmd(host['ip'], username, password or None)
 
     def get_all_tunnels(self) -> List[Dict]:
-        """Get all tunnels"""
-        return list(self.tunnels.values())
+        """Get all tunnels as dictionaries"""
+        # Snapshot under the lock so a concurrent create/delete cannot
+        # resize the dict mid-iteration
+        with self._lock:
+            return [tunnel.to_dict() for tunnel in self.tunnels.values()]
 
     def _get_switch_by_id(self, switch_id: int) -> Optional[Dict]:
         """Get switch info by switch ID"""
-        switches = self.ovs_manager.get_all_switches()
-        return next((s for s in switches if s['id'] == switch_id), None)
+        self._get_switches_snapshot()
+        return self._switch_by_id.get(switch_id)
 
     def _get_host_for_switch(self, switch_id: int) -> Optional[Dict]:
         """Get the host that a switch belongs to"""
@@ -363,41 +773,63 @@ class VXLANManager:
 
     def delete_tunnel(self, tunnel_id: int) -> bool:
         """Delete a tunnel"""
-        if tunnel_id not in self.tunnels:
+        with self._lock:
+            tunnel = self.tunnels.get(tunnel_id)
+        if tunnel is None:
             print(f"Tunnel {tunnel_id} not found in tunnel list")
             return False
 
-        tunnel = self.tunnels[tunnel_id]
-
-        # Get host info by looking up the switch first, then getting its host
-        src_host = self._get_host_for_switch(tunnel['src_switch_id'])
-        dst_host = self._get_host_for_switch(tunnel['dst_switch_id'])
+        # Host ids were captured when the tunnel was created/discovered,
+        # so this is a direct host lookup - no switch resolution needed
+        src_host = self._get_host_by_id(tunnel.src_host_id)
+        dst_host = self._get_host_by_id(tunnel.dst_host_id)
 
         if not src_host or not dst_host:
             print(f"Could not find hosts for tunnel {tunnel_id}")
-            print(f"  src_switch_id={tunnel['src_switch_id']}, dst_switch_id={tunnel['dst_switch_id']}")
+            print(f"  src_switch_id={tunnel.src_switch_id}, dst_switch_id={tunnel.dst_switch_id}")
             # Still remove from our tracking even if we can't delete the ports
             # (e.g., if host was removed)
-            del self.tunnels[tunnel_id]
+            with self._lock:
+                self.tunnels.pop(tunnel_id, None)
+                self._tunnel_index.pop(
+                    self._tunnel_key(tunnel.vni, tunnel.src_vxlan_ip, tunnel.dst_vxlan_ip), None)
+                self._release_vni(tunnel.vni)
             return True
 
         # Delete both tunnel endpoints
-        # Handle both old and new tunnel name formats for backward compatibility
-        tunnel_name_src = tunnel.get('tunnel_name_src', tunnel.get('tunnel_name'))
-        tunnel_name_dst = tunnel.get('tunnel_name_dst', tunnel.get('tunnel_name'))
+        tunnel_name_src = tunnel.tunnel_name_src
+        tunnel_name_dst = tunnel.tunnel_name_dst
 
         print(f"Deleting tunnel {tunnel_id}: {tunnel_name_src} on {src_host['hostname']}, {tunnel_name_dst} on {dst_host['hostname']}")
 
-        src_deleted = self._del_vxlan_port(src_host, tunnel['src_switch_name'], tunnel_name_src)
-        dst_deleted = self._del_vxlan_port(dst_host, tunnel['dst_switch_name'], tunnel_name_dst)
+        if src_host['id'] == dst_host['id']:
+            # Both endpoints on one host: delete them in a single batched
+            # ovs-vsctl transaction (--if-exists keeps the batch from
+            # aborting if one port was already removed out-of-band)
+            deleted = self._run_ovs_vsctl(src_host, [
+                '--', '--if-exists', 'del-port', tunnel.src_switch_name, tunnel_name_src,
+                '--', '--if-exists', 'del-port', tunnel.dst_switch_name, tunnel_name_dst,
+            ])
+            src_deleted = dst_deleted = deleted
+        else:
+            src_deleted = self._del_vxlan_port(src_host, tunnel.src_switch_name, tunnel_name_src)
+            dst_deleted = self._del_vxlan_port(dst_host, tunnel.dst_switch_name, tunnel_name_dst)
 
         if not src_deleted:
             print(f"  Warning: Failed to delete {tunnel_name_src} on {src_host['hostname']}")
         if not dst_deleted:
             print(f"  Warning: Failed to delete {tunnel_name_dst} on {dst_host['hostname']}")
 
+        # The port lists for these hosts just changed
+        self._vxlan_ports_cache.pop(src_host['id'], None)
+        self._vxlan_ports_cache.pop(dst_host['id'], None)
+
         # Remove from dict regardless of port deletion success
-        del self.tunnels[tunnel_id]
+        with self._lock:
+            self.tunnels.pop(tunnel_id, None)
+            self._tunnel_index.pop(
+                self._tunnel_key(tunnel.vni, tunnel.src_vxlan_ip, tunnel.dst_vxlan_ip), None)
+            self._release_vni(tunnel.vni)
 
         return True
 